@@ -1,46 +1,181 @@
-import openai
+import asyncio
+import atexit
+import copy
+import hashlib
+import re
+import sqlite3
+import string
+import threading
+import time
+from collections import deque
+import httpx
+from openai import (OpenAI, AsyncOpenAI, OpenAIError, RateLimitError, APITimeoutError,
+                    APIConnectionError, InternalServerError)
 import os
-from typing import Dict, List
+from typing import Dict, Iterator, List
 import json
 
-# ==================== OPENAI EMAIL REVIEWER ====================
-class AIEmailReviewer:
+# Default chat model: fast and cheap, with a large rate-limit pool
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Max concurrent HTTP connections shared by one batch of async calls
+MAX_CONNECTIONS = 20
+
+# Default OpenAI rate limits and retry policy
+MAX_REQUESTS_PER_MINUTE = 500
+MAX_TOKENS_PER_MINUTE = 30000
+MAX_ATTEMPTS = 5
+
+# Seconds between Batch API status checks
+BATCH_POLL_INTERVAL = 60
+
+# Errors worth retrying; anything else fails the request immediately
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# Semantic cache: embedding model, cosine similarity needed for a hit, and capacity
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.87
+MAX_CACHE_ENTRIES = 1000
+
+# Exact-match response cache: location and entry lifetime in seconds
+EXACT_CACHE_PATH = "llm_cache.sqlite"
+EXACT_CACHE_TTL = 7 * 24 * 3600
+# Hit/miss counters are written to disk at most this often (seconds), not per lookup
+EXACT_CACHE_STATS_FLUSH = 60
+
+
+# ==================== EXACT CACHE ====================
+class ExactCache:
     """
-    AI-powered email reviewer using OpenAI GPT
-    Reviews emails for grammar, tone, completeness, and professionalism
+    Disk cache of API responses keyed by the sha256 of the full request.
+    Identical deterministic (temperature 0) requests never hit the API twice.
+    Hit/miss counters are stored alongside so any process can report them;
+    they are counted in memory and flushed every EXACT_CACHE_STATS_FLUSH seconds
     """
 
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        openai.api_key = self.api_key
+    def __init__(self, path: str = EXACT_CACHE_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+        self._flushed_at = time.monotonic()
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self.conn.execute("INSERT OR IGNORE INTO cache_stats (id) VALUES (1)")
+        atexit.register(self.close)
 
-    def review_email(self, email_content: str, company_name: str = "",
-                     recipient_name: str = "", job_title: str = "") -> Dict:
+    @staticmethod
+    def make_key(request: Dict) -> str:
         """
-        Review an internship application email
+        Stable key for a chat completion request
+        """
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
 
-        Args:
-            email_content: The email body to review
-            company_name: Target company name
-            recipient_name: Recipient's name
-            job_title: Job title applying for
+    def get(self, key: str):
+        """
+        Return the cached dict for key, or None if missing or expired
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            if row:
+                self._hits += 1
+            else:
+                self._misses += 1
+            if time.monotonic() - self._flushed_at >= EXACT_CACHE_STATS_FLUSH:
+                with self.conn:
+                    self._flush_stats()
+        return json.loads(row[0]) if row else None
 
-        Returns:
-            Dictionary with review results, suggestions, and score
+    def set(self, key: str, value: Dict, ttl: float = EXACT_CACHE_TTL):
         """
+        Store value under key for ttl seconds (forever if ttl is None)
+        """
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            # Already in a write transaction: the pending counters ride along
+            self._flush_stats()
 
-        prompt = f"""
-You are an expert career coach reviewing an internship application email.
+    def stats(self) -> Dict:
+        """
+        Hit/miss counters since the cache file was created
+        """
+        with self._lock:
+            hits, misses = self.conn.execute("SELECT hits, misses FROM cache_stats WHERE id = 1").fetchone()
+            return {"hits": hits + self._hits, "misses": misses + self._misses}
 
-**Email Details:**
-- Company: {company_name or 'Not specified'}
-- Recipient: {recipient_name or 'Not specified'}
-- Position: {job_title or 'PFE Internship'}
+    def close(self):
+        """
+        Flush the pending counters and close the database (safe to call twice)
+        """
+        with self._lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self._flush_stats()
+            self.conn.close()
+            self.conn = None
 
-**Email to Review:**
-{email_content}
+    def _flush_stats(self):
+        """
+        Add the in-memory counters to cache_stats; caller holds the lock and a transaction
+        """
+        if self._hits or self._misses:
+            self.conn.execute("UPDATE cache_stats SET hits = hits + ?, misses = misses + ? WHERE id = 1",
+                              (self._hits, self._misses))
+            self._hits = self._misses = 0
+        self._flushed_at = time.monotonic()
 
-**Please analyze this email and provide:**
+
+# Keywords the rule-based fallback review looks for, matched in one pass
+_FALLBACK_KEYWORDS = ("cv", "resume", "thank", "interested", "excited", "passionate")
+
+try:
+    import ahocorasick
+
+    _FALLBACK_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in _FALLBACK_KEYWORDS:
+        _FALLBACK_AUTOMATON.add_word(_keyword, _keyword)
+    _FALLBACK_AUTOMATON.make_automaton()
+    _FALLBACK_RE = None
+except ImportError:
+    _FALLBACK_AUTOMATON = None
+    # Case-insensitive, so the email never has to be copied with .lower()
+    _FALLBACK_RE = re.compile("|".join(map(re.escape, _FALLBACK_KEYWORDS)), re.IGNORECASE)
+
+
+# ==================== PROMPT TEMPLATES ====================
+# Built once at import. The fixed instructions come first and the per-call
+# details last, so consecutive requests share a long identical prefix that
+# the API can serve from its prompt cache.
+
+_REVIEW_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a professional career coach specializing in internship applications."
+}
+
+_REVIEW_USER_TMPL = string.Template("""
+You are an expert career coach reviewing an internship application email.
+
+**Please analyze the email below and provide:**
 
 1. **Overall Score** (0-100): Rate the email's effectiveness
 2. **Strengths**: What works well (2-3 points)
@@ -61,56 +196,37 @@ You are an expert career coach reviewing an internship application email.
 - Enthusiasm without desperation
 
 **Format your response as JSON:**
-{{
+{
     "score": 85,
     "approved": true,
     "strengths": ["point 1", "point 2"],
     "weaknesses": ["point 1", "point 2"],
     "critical_issues": ["issue 1", "issue 2"],
     "suggestions": [
-        {{"issue": "...", "fix": "...", "example": "..."}},
-        {{"issue": "...", "fix": "...", "example": "..."}}
+        {"issue": "...", "fix": "...", "example": "..."},
+        {"issue": "...", "fix": "...", "example": "..."}
     ],
     "revised_subject": "...",
     "summary": "Brief overall assessment"
-}}
-"""
+}
 
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",  # or "gpt-3.5-turbo" for cheaper option
-                messages=[
-                    {"role": "system", "content": "You are a professional career coach specializing in internship applications."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+**Email Details:**
+- Company: $company
+- Recipient: $recipient
+- Position: $position
 
-            result = json.loads(response.choices[0].message.content)
-            return result
+**Email to Review:**
+$email
+""")
 
-        except Exception as e:
-            print(f"Error during AI review: {e}")
-            return self._fallback_review(email_content)
+_IMPROVE_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert at writing professional internship application emails."
+}
 
-    def improve_email(self, email_content: str, company_name: str = "",
-                      recipient_name: str = "", job_title: str = "") -> str:
-        """
-        Generate an improved version of the email
-        """
-
-        prompt = f"""
+_IMPROVE_USER_TMPL = string.Template("""
 Rewrite this internship application email to make it more professional and effective.
 
-**Original Email:**
-{email_content}
-
-**Context:**
-- Company: {company_name or 'Technology Company'}
-- Recipient: {recipient_name or 'Hiring Manager'}
-- Position: {job_title or 'PFE Internship'}
-
 **Requirements:**
 1. Keep it concise (150-200 words)
 2. Professional but warm tone
@@ -120,45 +236,50 @@ Rewrite this internship application email to make it more professional and effec
 6. Proper structure
 
 **Provide the improved email only, no explanations.**
-"""
 
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert at writing professional internship application emails."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=500
-            )
+**Context:**
+- Company: $company
+- Recipient: $recipient
+- Position: $position
 
-            return response.choices[0].message.content.strip()
+**Original Email:**
+$email
+""")
 
-        except Exception as e:
-            print(f"Error improving email: {e}")
-            return email_content
+_GENERATE_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert at writing compelling internship application emails."
+}
 
-    def generate_email(self, company_name: str, recipient_name: str,
-                       job_title: str, your_skills: List[str],
-                       your_name: str = "Abdessamad") -> str:
-        """
-        Generate a complete email from scratch
-        """
+_GENERATE_USER_TMPL = string.Template("""
+Write a professional internship application email.
 
-        skills_text = ", ".join(your_skills)
+**Requirements:**
+1. Professional subject line
+2. Personalized greeting
+3. Brief introduction
+4. Why interested in THIS company
+5. Relevant skills/experience
+6. Call to action
+7. Professional closing
 
-        prompt = f"""
-Write a professional internship application email.
+**Format:**
+SUBJECT: [Your subject line]
+
+[Email body]
 
 **Details:**
-- Applicant: {your_name}, 4th-year Computer Engineering student
-- Company: {company_name}
-- Recipient: {recipient_name}
-- Position: {job_title}
-- Key Skills: {skills_text}
+- Applicant: $applicant, 4th-year Computer Engineering student
+- Company: $company
+- Recipient: $recipient
+- Position: $position
+- Key Skills: $skills
+""")
 
-**Requirements:**
+_GENERATE_BATCH_USER_TMPL = string.Template("""
+Write one professional internship application email per case below.
+
+**Requirements for every email:**
 1. Professional subject line
 2. Personalized greeting
 3. Brief introduction
@@ -167,28 +288,623 @@ Write a professional internship application email.
 6. Call to action
 7. Professional closing
 
-**Format:**
+**Format of each email:**
 SUBJECT: [Your subject line]
 
 [Email body]
-"""
 
+**Return JSON with the emails in the same order as the cases:**
+{"emails": ["email for case 1", "email for case 2"]}
+
+**Cases ($count):**
+$cases
+""")
+
+
+# ==================== SEMANTIC CACHE ====================
+class SemanticCache:
+    """
+    In-memory review cache keyed by meaning rather than exact text.
+    Drafts that differ by a word or two embed close together, so a new
+    draft within the similarity threshold of a cached one reuses its review
+    """
+
+    def __init__(self, embedder=None, threshold: float = SIMILARITY_THRESHOLD,
+                 max_entries: int = MAX_CACHE_ENTRIES):
+        import numpy as np
+
+        self._np = np
+        # A model with .encode(), or a no-argument factory returning one, called on first use
+        self._embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self.embeddings = None                  # (max_entries, dim) float32, L2-normalized rows
+        self.ids = [None] * max_entries         # sha256 of the cached text per slot
+        self.responses = [None] * max_entries
+        self.last_used = [0] * max_entries
+        self.slots = {}                         # sha256 -> slot, for exact hits without embedding
+        self.size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def get(self, text: str):
+        """
+        Return (copy of the cached response for text or a near-duplicate, else None,
+        the text's embedding if one was computed, else None).
+        Hand the embedding to set() after a miss so the text is not embedded twice
+        """
+        key = self._key(text)
+        query = None
+        with self._lock:
+            slot = self.slots.get(key)
+            if slot is None and self.size:
+                query = self._embed(text)
+                scores = self.embeddings[:self.size] @ query
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold:
+                    slot = best
+            if slot is None:
+                return None, query
+            self._touch(slot)
+            return copy.deepcopy(self.responses[slot]), query
+
+    def set(self, text: str, response: Dict, embedding=None):
+        """
+        Cache a copy of response, evicting the least recently used entry when full
+        """
+        key = self._key(text)
+        if embedding is None:
+            embedding = self._embed(text)
+        response = copy.deepcopy(response)
+        with self._lock:
+            if key in self.slots:
+                slot = self.slots[key]
+            elif self.size < self.max_entries:
+                slot = self.size
+                self.size += 1
+            else:
+                slot = min(range(self.max_entries), key=self.last_used.__getitem__)
+                del self.slots[self.ids[slot]]
+
+            if self.embeddings is None:
+                self.embeddings = self._np.zeros((self.max_entries, embedding.shape[0]), dtype=self._np.float32)
+            self.embeddings[slot] = embedding
+            self.ids[slot] = key
+            self.responses[slot] = response
+            self.slots[key] = slot
+            self._touch(slot)
+
+    def _embed(self, text: str):
+        """
+        L2-normalized float32 embedding, so a dot product is the cosine similarity
+        """
+        if self._embedder is not None and not hasattr(self._embedder, "encode"):
+            self._embedder = self._embedder()
+        if self._embedder is None:
+            from sentence_transformers import SentenceTransformer
+            self._embedder = SentenceTransformer(EMBEDDING_MODEL)
+        return self._embedder.encode(text, normalize_embeddings=True).astype(self._np.float32)
+
+    def _touch(self, slot: int):
+        self._clock += 1
+        self.last_used[slot] = self._clock
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ==================== PARALLEL REQUEST PROCESSOR ====================
+class ParallelReviewer:
+    """
+    Runs many chat completion requests concurrently while staying under
+    the requests-per-minute and tokens-per-minute limits of the account.
+    Rate-limited or timed out requests are retried with exponential backoff
+    """
+
+    def __init__(self, api_key: str = None,
+                 max_requests_per_minute: float = MAX_REQUESTS_PER_MINUTE,
+                 max_tokens_per_minute: float = MAX_TOKENS_PER_MINUTE,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.max_attempts = max_attempts
+
+    async def run(self, requests: List[Dict]) -> List:
+        """
+        Send every request and collect the results
+
+        Args:
+            requests: Keyword arguments for chat.completions.create, one per call
+
+        Returns:
+            Message content for each request, or the exception that made it fail
+        """
+        results = [None] * len(requests)
+        queue = deque((index, 1) for index in range(len(requests)))
+        in_flight = set()
+
+        # Leaky buckets, refilled continuously up to one minute of capacity
+        available_request_capacity = self.max_requests_per_minute
+        available_token_capacity = self.max_tokens_per_minute
+        last_update = time.monotonic()
+
+        async with httpx.AsyncClient(limits=httpx.Limits(max_connections=MAX_CONNECTIONS)) as http_client, \
+                AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=0) as client:
+            while queue or in_flight:
+                now = time.monotonic()
+                elapsed = now - last_update
+                last_update = now
+                available_request_capacity = min(
+                    available_request_capacity + self.max_requests_per_minute * elapsed / 60,
+                    self.max_requests_per_minute)
+                available_token_capacity = min(
+                    available_token_capacity + self.max_tokens_per_minute * elapsed / 60,
+                    self.max_tokens_per_minute)
+
+                if queue:
+                    index, attempt = queue[0]
+                    # Capped at the bucket size: a larger estimate could never be
+                    # afforded and would stall the whole batch; it waits for a full bucket
+                    tokens = min(self._estimate_tokens(requests[index]), self.max_tokens_per_minute)
+                    if available_request_capacity >= 1 and available_token_capacity >= tokens:
+                        queue.popleft()
+                        available_request_capacity -= 1
+                        available_token_capacity -= tokens
+
+                        task = asyncio.create_task(
+                            self._call(client, requests[index], index, attempt, results, queue))
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                        continue
+
+                await asyncio.sleep(0.01)
+
+        return results
+
+    async def _call(self, client: AsyncOpenAI, request: Dict, index: int, attempt: int,
+                    results: List, queue: deque):
+        """
+        Send one request, re-queueing it after a backoff if it can be retried
+        """
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert at writing compelling internship application emails."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.9,
-                max_tokens=600
-            )
+            response = await client.chat.completions.create(**request)
+            results[index] = response.choices[0].message.content
 
-            return response.choices[0].message.content.strip()
+        except RETRYABLE_ERRORS as e:
+            if attempt >= self.max_attempts:
+                results[index] = e
+                return
+            await asyncio.sleep(2 ** attempt)
+            queue.append((index, attempt + 1))
 
         except Exception as e:
-            print(f"Error generating email: {e}")
-            return self._template_email(company_name, recipient_name, job_title)
+            results[index] = e
+
+    @staticmethod
+    def _estimate_tokens(request: Dict) -> int:
+        """
+        Rough token cost of a request: ~4 characters per prompt token plus the completion budget
+        """
+        prompt_chars = sum(len(message["content"]) for message in request["messages"])
+        return prompt_chars // 4 + request.get("max_tokens", 0)
+
+
+# ==================== OPENAI EMAIL REVIEWER ====================
+class AIEmailReviewer:
+    """
+    AI-powered email reviewer using OpenAI GPT
+    Reviews emails for grammar, tone, completeness, and professionalism
+    """
+
+    def __init__(self, api_key: str = None, model: str = DEFAULT_MODEL, review_model: str = None,
+                 use_semantic_cache: bool = True, embedder=None, cache_path: str = EXACT_CACHE_PATH,
+                 exact_cache: ExactCache = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+
+        # Use a stronger review_model (e.g. "gpt-4o") for final send-grade reviews
+        self.model = model
+        self.review_model = review_model or model
+        # Created on the first API call, so a missing key only sends calls to the fallbacks
+        self._client = None
+
+        # Identical requests are answered from disk (cache_path=None disables it);
+        # pass exact_cache to share one instance with other readers of its stats
+        self.exact_cache = exact_cache or (ExactCache(cache_path) if cache_path else None)
+
+        # Near-duplicate drafts reuse a previous review (needs numpy + sentence-transformers)
+        self.semantic_cache = None
+        if use_semantic_cache:
+            try:
+                self.semantic_cache = SemanticCache(embedder=embedder)
+            except ImportError:
+                print("Semantic cache disabled: numpy is not installed")
+
+    @property
+    def client(self) -> OpenAI:
+        """
+        OpenAI client, created on first use (raises OpenAIError if no API key is set)
+        """
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key, max_retries=MAX_ATTEMPTS - 1)
+        return self._client
+
+    def review_email(self, email_content: str, company_name: str = "",
+                     recipient_name: str = "", job_title: str = "") -> Dict:
+        """
+        Review an internship application email
+
+        Args:
+            email_content: The email body to review
+            company_name: Target company name
+            recipient_name: Recipient's name
+            job_title: Job title applying for
+
+        Returns:
+            Dictionary with review results, suggestions, and score
+        """
+
+        cache_text = "\n".join((company_name, recipient_name, job_title, email_content))
+        cached, embedding = self._semantic_cache_get(cache_text)
+        if cached is not None:
+            return cached
+
+        request = self._review_request(email_content, company_name, recipient_name, job_title)
+
+        try:
+            result = json.loads(self._complete(request))
+
+        except (OpenAIError, json.JSONDecodeError) as e:
+            print(f"Error during AI review: {e}")
+            return self._fallback_review(email_content)
+
+        self._semantic_cache_set(cache_text, result, embedding)
+        return result
+
+    def improve_email(self, email_content: str, company_name: str = "",
+                      recipient_name: str = "", job_title: str = "") -> str:
+        """
+        Generate an improved version of the email
+        """
+        return "".join(self.improve_email_stream(email_content, company_name, recipient_name, job_title)).strip()
+
+    def improve_email_stream(self, email_content: str, company_name: str = "",
+                             recipient_name: str = "", job_title: str = "") -> Iterator[str]:
+        """
+        Stream an improved version of the email as it is generated
+        """
+        request = self._improve_request(email_content, company_name, recipient_name, job_title)
+        yield from self._stream_or_fallback(request, email_content, "Error improving email")
+
+    def generate_email(self, company_name: str, recipient_name: str,
+                       job_title: str, your_skills: List[str],
+                       your_name: str = "Abdessamad") -> str:
+        """
+        Generate a complete email from scratch
+        """
+        return "".join(self.generate_email_stream(
+            company_name, recipient_name, job_title, your_skills, your_name)).strip()
+
+    def generate_email_stream(self, company_name: str, recipient_name: str,
+                              job_title: str, your_skills: List[str],
+                              your_name: str = "Abdessamad") -> Iterator[str]:
+        """
+        Stream a complete email from scratch as it is generated
+        """
+        request = self._generate_request(company_name, recipient_name, job_title, your_skills, your_name)
+        fallback = self._template_email(company_name, recipient_name, job_title)
+        yield from self._stream_or_fallback(request, fallback, "Error generating email")
+
+    def _semantic_cache_get(self, text: str):
+        if self.semantic_cache is None:
+            return None, None
+        try:
+            return self.semantic_cache.get(text)
+        except ImportError:
+            print("Semantic cache disabled: sentence-transformers is not installed")
+            self.semantic_cache = None
+            return None, None
+
+    def _semantic_cache_set(self, text: str, result: Dict, embedding=None):
+        if self.semantic_cache is None:
+            return
+        try:
+            self.semantic_cache.set(text, result, embedding)
+        except ImportError:
+            print("Semantic cache disabled: sentence-transformers is not installed")
+            self.semantic_cache = None
+
+    def generate_emails(self, cases: List[Dict]) -> List[str]:
+        """
+        Generate several emails with a single API request
+
+        All cases share one system prompt and one request, so K emails
+        cost one slot of the requests-per-minute limit instead of K.
+
+        Args:
+            cases: List of dicts with the keyword arguments of generate_email
+
+        Returns:
+            List of emails, in the same order as cases
+        """
+        if not cases:
+            return []
+
+        try:
+            request = self._generate_batch_request(cases)
+            emails = json.loads(self._complete(request))["emails"]
+            if len(emails) != len(cases):
+                raise ValueError(f"expected {len(cases)} emails, got {len(emails)}")
+            return [email.strip() for email in emails]
+
+        # TypeError / AttributeError: a malformed case or reply item (non-dict, None field)
+        except (OpenAIError, KeyError, ValueError, TypeError, AttributeError) as e:
+            print(f"Error generating emails: {e}")
+            return [self._template_case_email(case) for case in cases]
+
+    # ==================== ASYNC / BATCH ====================
+
+    def review_emails_batch(self, emails: List[Dict],
+                            max_requests_per_minute: float = MAX_REQUESTS_PER_MINUTE,
+                            max_tokens_per_minute: float = MAX_TOKENS_PER_MINUTE) -> List[Dict]:
+        """
+        Review many emails concurrently, throttled to the account rate limits
+        Blocking wrapper around areview_emails_batch; from async code await that instead
+
+        Args:
+            emails: List of dicts with the keyword arguments of review_email
+            max_requests_per_minute: Request rate limit to stay under
+            max_tokens_per_minute: Token rate limit to stay under
+
+        Returns:
+            List of review dictionaries, in the same order as emails
+        """
+        return asyncio.run(self.areview_emails_batch(emails, max_requests_per_minute, max_tokens_per_minute))
+
+    async def areview_emails_batch(self, emails: List[Dict],
+                                   max_requests_per_minute: float = MAX_REQUESTS_PER_MINUTE,
+                                   max_tokens_per_minute: float = MAX_TOKENS_PER_MINUTE) -> List[Dict]:
+        """
+        Async version of review_emails_batch, for callers already inside an event loop
+        """
+        requests = [self._review_request(**e) for e in emails]
+        processor = ParallelReviewer(self.api_key, max_requests_per_minute, max_tokens_per_minute)
+        try:
+            results = await processor.run(requests)
+        except OpenAIError as e:
+            # e.g. no API key: every email gets the rule-based review
+            results = [e] * len(emails)
+
+        reviews = []
+        for email, result in zip(emails, results):
+            if isinstance(result, Exception):
+                print(f"Error during AI review: {result}")
+                reviews.append(self._fallback_review(email["email_content"]))
+                continue
+            try:
+                reviews.append(json.loads(result))
+            except json.JSONDecodeError as e:
+                print(f"Error during AI review: {e}")
+                reviews.append(self._fallback_review(email["email_content"]))
+        return reviews
+
+    def review_emails_batch_api(self, emails: List[Dict], poll_interval: int = BATCH_POLL_INTERVAL) -> List[Dict]:
+        """
+        Review many emails through the OpenAI Batch API
+
+        Batches cost half the tokens and use a separate rate-limit pool,
+        but may take up to 24h, so this suits large overnight backlogs.
+
+        Args:
+            emails: List of dicts with the keyword arguments of review_email
+            poll_interval: Seconds to wait between batch status checks
+
+        Returns:
+            List of review dictionaries, in the same order as emails
+        """
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._review_request(**email)
+            })
+            for i, email in enumerate(emails)
+        ]
+        batch_file = self.client.files.create(
+            file=("reviews.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+
+        contents = {}
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") == 200:
+                    contents[result["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+
+        reviews = []
+        for i, email in enumerate(emails):
+            try:
+                reviews.append(json.loads(contents[str(i)]))
+            except (KeyError, json.JSONDecodeError) as e:
+                print(f"Error during batch AI review: {e!r} (batch status: {batch.status})")
+                reviews.append(self._fallback_review(email["email_content"]))
+        return reviews
+
+    def _complete(self, request: Dict) -> str:
+        """
+        Send one chat completion request and return the message content
+        """
+        cacheable = self._cacheable(request)
+        if cacheable:
+            key = ExactCache.make_key(request)
+            cached = self.exact_cache.get(key)
+            if cached is not None:
+                return cached["content"]
+
+        response = self.client.chat.completions.create(**request)
+        content = response.choices[0].message.content
+
+        if cacheable:
+            self.exact_cache.set(key, {"content": content})
+        return content
+
+    def _complete_stream(self, request: Dict) -> Iterator[str]:
+        """
+        Send one chat completion request and yield the content as it arrives
+
+        The response is only cached once fully received; if the consumer
+        stops early the stream is closed and nothing is cached.
+        """
+        cacheable = self._cacheable(request)
+        if cacheable:
+            key = ExactCache.make_key(request)
+            cached = self.exact_cache.get(key)
+            if cached is not None:
+                yield cached["content"]
+                return
+
+        parts = []
+        stream = self.client.chat.completions.create(**request, stream=True)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        finally:
+            stream.close()
+
+        if cacheable:
+            self.exact_cache.set(key, {"content": "".join(parts)})
+
+    def _cacheable(self, request: Dict) -> bool:
+        """
+        Only deterministic (temperature 0) requests use the exact cache; sampled
+        rewrites and generations should differ from one call to the next
+        """
+        return self.exact_cache is not None and request.get("temperature") == 0
+
+    def _stream_or_fallback(self, request: Dict, fallback: str, error_message: str) -> Iterator[str]:
+        """
+        Stream a completion, yielding fallback instead if the API fails before any output
+        """
+        streamed = False
+        try:
+            for text in self._complete_stream(request):
+                streamed = True
+                yield text
+
+        except OpenAIError as e:
+            print(f"{error_message}: {e}")
+            if not streamed:
+                yield fallback
+
+    # ==================== PROMPTS ====================
+
+    def _review_request(self, email_content: str, company_name: str = "",
+                        recipient_name: str = "", job_title: str = "") -> Dict:
+        """
+        Build the chat completion request for a review
+        """
+        prompt = _REVIEW_USER_TMPL.substitute(
+            company=company_name or 'Not specified',
+            recipient=recipient_name or 'Not specified',
+            position=job_title or 'PFE Internship',
+            email=email_content
+        )
+
+        return {
+            "model": self.review_model,
+            "messages": [_REVIEW_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            "temperature": 0,  # deterministic reviews make the exact cache effective
+            "max_tokens": 1000,
+            "response_format": {"type": "json_object"}
+        }
+
+    def _improve_request(self, email_content: str, company_name: str = "",
+                         recipient_name: str = "", job_title: str = "") -> Dict:
+        """
+        Build the chat completion request for an email rewrite
+        """
+        prompt = _IMPROVE_USER_TMPL.substitute(
+            company=company_name or 'Technology Company',
+            recipient=recipient_name or 'Hiring Manager',
+            position=job_title or 'PFE Internship',
+            email=email_content
+        )
+
+        return {
+            "model": self.model,
+            "messages": [_IMPROVE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            "temperature": 0.8,
+            "max_tokens": 500
+        }
+
+    def _generate_request(self, company_name: str, recipient_name: str,
+                          job_title: str, your_skills: List[str],
+                          your_name: str = "Abdessamad") -> Dict:
+        """
+        Build the chat completion request for a new email
+        """
+        prompt = _GENERATE_USER_TMPL.substitute(
+            applicant=your_name,
+            company=company_name,
+            recipient=recipient_name,
+            position=job_title,
+            skills=", ".join(your_skills)
+        )
+
+        return {
+            "model": self.model,
+            "messages": [_GENERATE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            "temperature": 0.9,
+            "max_tokens": 600
+        }
+
+    def _generate_batch_request(self, cases: List[Dict]) -> Dict:
+        """
+        Build one chat completion request that writes an email per case
+        """
+
+        case_list = [
+            {
+                "applicant": f"{case.get('your_name', 'Abdessamad')}, 4th-year Computer Engineering student",
+                "company": case["company_name"],
+                "recipient": case["recipient_name"],
+                "position": case["job_title"],
+                "key_skills": ", ".join(case["your_skills"])
+            }
+            for case in cases
+        ]
+
+        prompt = _GENERATE_BATCH_USER_TMPL.substitute(
+            count=len(cases),
+            cases=json.dumps(case_list, indent=2)
+        )
+
+        return {
+            "model": self.model,
+            "messages": [_GENERATE_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            "temperature": 0.9,
+            "max_tokens": 600 * len(cases),
+            "response_format": {"type": "json_object"}
+        }
+
+    # ==================== FALLBACKS ====================
 
     def _fallback_review(self, email_content: str) -> Dict:
         """
@@ -206,16 +922,21 @@ SUBJECT: [Your subject line]
             issues.append("Email is too long (over 300 words)")
             score -= 10
 
-        # Check for key elements
-        if "cv" not in email_content.lower() and "resume" not in email_content.lower():
+        # Check for key elements (all keywords found in a single scan)
+        if _FALLBACK_AUTOMATON is not None:
+            matched = {keyword for _, keyword in _FALLBACK_AUTOMATON.iter(email_content.lower())}
+        else:
+            matched = {m.group().lower() for m in _FALLBACK_RE.finditer(email_content)}
+
+        if "cv" not in matched and "resume" not in matched:
             issues.append("No mention of CV/resume")
             score -= 15
 
-        if "thank" not in email_content.lower():
+        if "thank" not in matched:
             issues.append("No thank you statement")
             score -= 10
 
-        if not any(word in email_content.lower() for word in ["interested", "excited", "passionate"]):
+        if matched.isdisjoint(("interested", "excited", "passionate")):
             issues.append("Lacks enthusiasm")
             score -= 15
 
@@ -230,6 +951,16 @@ SUBJECT: [Your subject line]
             "summary": f"Rule-based review score: {score}/100"
         }
 
+    def _template_case_email(self, case) -> str:
+        """
+        Fallback email template for one generate_emails case, tolerating malformed cases
+        """
+        if not isinstance(case, dict):
+            case = {}
+        return self._template_email(case.get("company_name") or "your company",
+                                    case.get("recipient_name"),
+                                    case.get("job_title") or "internship")
+
     def _template_email(self, company_name: str, recipient_name: str, job_title: str) -> str:
         """
         Fallback email template
@@ -1,9 +1,9 @@
 import streamlit as st
+import csv
+import io
 import sqlite3
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 
 # Page config
 st.set_page_config(
@@ -12,43 +12,115 @@ st.set_page_config(
     layout="wide"
 )
 
-# Database connection
+DB_PATH = 'internship_tracker.db'
+
+# Database connection: one for the whole server, shared by every session and rerun.
+# Streamlit runs reruns on different threads, so every use holds db_lock.
+# Autocommit mode: writes that need a transaction open one explicitly.
 @st.cache_resource
 def get_db_connection():
-    return sqlite3.connect('internship_tracker.db', check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    # Indexes for the predicates every dashboard query filters or sorts on
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_apps_resp_fup ON applications(response_received, next_follow_up_date);
+        CREATE INDEX IF NOT EXISTS idx_apps_sent ON applications(sent_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_apps_company ON applications(company_id);
+        CREATE INDEX IF NOT EXISTS idx_jobs_applied_scraped ON job_posts(applied, scraped_at DESC);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_url ON job_posts(url);
+    """)
+
+    # response_days is materialized when a response is recorded, not recomputed per render
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(applications)")]
+    if 'response_days' not in columns:
+        conn.execute("BEGIN")
+        try:
+            conn.execute("ALTER TABLE applications ADD COLUMN response_days INTEGER")
+            conn.execute("""
+                UPDATE applications
+                SET response_days = CAST((julianday(response_date) - julianday(sent_at)) AS INTEGER)
+                WHERE response_date IS NOT NULL
+            """)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_apps_response_days
+        AFTER UPDATE OF response_date ON applications
+        BEGIN
+            UPDATE applications
+            SET response_days = CAST((julianday(NEW.response_date) - julianday(NEW.sent_at)) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+    """)
+    return conn
+
+@st.cache_resource
+def get_db_lock():
+    return threading.Lock()
 
 conn = get_db_connection()
+db_lock = get_db_lock()
+
+# The embedding model and OpenAI client survive reruns instead of reloading per click
+@st.cache_resource
+def get_embedder():
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    from ai_email_reviewer import EMBEDDING_MODEL
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+@st.cache_resource
+def get_exact_cache():
+    from ai_email_reviewer import ExactCache
+    return ExactCache()
+
+@st.cache_resource
+def get_reviewer():
+    from ai_email_reviewer import AIEmailReviewer
+    # The factory defers the model load to the first semantic-cache lookup, if any
+    return AIEmailReviewer(embedder=get_embedder, exact_cache=get_exact_cache())
 
 # Title
 st.title("🎯 Internship Application Tracker Dashboard")
 st.markdown("---")
 
-# Fetch statistics
-def get_statistics():
-    cursor = conn.cursor()
+def q(sql, params=()):
+    """Run a query and return its rows as plain tuples"""
+    with db_lock:
+        return conn.execute(sql, params).fetchall()
+
+def q_dicts(sql, params=()):
+    """Run a query and return its rows as column -> value dicts, ready for st.dataframe"""
+    with db_lock:
+        cursor = conn.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
 
-    # Total applications
-    cursor.execute("SELECT COUNT(*) FROM applications")
-    total_sent = cursor.fetchone()[0]
+# Cached query results expire after this many seconds, or when the dashboard writes
+CACHE_TTL = 30
 
-    # Responses
-    cursor.execute("SELECT COUNT(*) FROM applications WHERE response_received = 1")
-    responses = cursor.fetchone()[0]
+# Fetch statistics
+@st.cache_data(ttl=CACHE_TTL)
+def get_statistics():
+    # All counters in a single pass over applications
+    total_sent, responses, followups_needed, companies = q("""
+        SELECT COUNT(*),
+               COALESCE(SUM(response_received), 0),
+               COUNT(CASE WHEN response_received = 0 AND next_follow_up_date <= datetime('now') THEN 1 END),
+               COUNT(DISTINCT company_id)
+        FROM applications
+    """)[0]
 
     # Pending
     pending = total_sent - responses
 
-    # Follow-ups needed
-    cursor.execute("""
-        SELECT COUNT(*) FROM applications 
-        WHERE response_received = 0 AND next_follow_up_date <= ?
-    """, (datetime.now(),))
-    followups_needed = cursor.fetchone()[0]
-
-    # Companies contacted
-    cursor.execute("SELECT COUNT(DISTINCT company_id) FROM applications")
-    companies = cursor.fetchone()[0]
-
     response_rate = (responses / total_sent * 100) if total_sent > 0 else 0
 
     return {
@@ -60,6 +132,99 @@ def get_statistics():
         'response_rate': response_rate
     }
 
+@st.cache_data(ttl=CACHE_TTL)
+def load_timeline():
+    query = """
+        SELECT DATE(sent_at) as date, COUNT(*) as count
+        FROM applications
+        WHERE sent_at >= date('now', '-30 days')
+        GROUP BY DATE(sent_at)
+        ORDER BY date
+    """
+    return q(query)
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_followups():
+    query = """
+        SELECT c.company_name, c.email, c.contact_name, a.sent_at, a.follow_up_count
+        FROM companies c
+        JOIN applications a ON c.id = a.company_id
+        WHERE a.response_received = 0 AND a.next_follow_up_date <= datetime('now')
+        ORDER BY a.sent_at ASC
+    """
+    rows = q_dicts(query)
+
+    # Timestamps are stored in UTC, like SQLite's datetime('now')
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for row in rows:
+        row['days_ago'] = days_since(row['sent_at'], now)
+    return rows
+
+def days_since(timestamp, now):
+    """Whole days from an ISO timestamp to now; None if it is missing or not ISO"""
+    try:
+        return (now - datetime.fromisoformat(timestamp)).days
+    except (TypeError, ValueError):
+        return None
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_recent():
+    query = """
+        SELECT c.company_name, c.email, a.subject, a.sent_at, 
+               CASE WHEN a.response_received = 1 THEN '✅ Responded' ELSE '⏳ Pending' END as status
+        FROM applications a
+        JOIN companies c ON a.company_id = c.id
+        ORDER BY a.sent_at DESC
+        LIMIT 10
+    """
+    return q_dicts(query)
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_jobs():
+    query = """
+        SELECT title, company_name, location, url, posted_date, applied
+        FROM job_posts
+        WHERE applied = 0
+        ORDER BY scraped_at DESC
+        LIMIT 5
+    """
+    return q(query)
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_top():
+    query = """
+        SELECT c.company_name, c.field, a.response_days
+        FROM companies c
+        JOIN applications a ON c.id = a.company_id
+        WHERE a.response_received = 1
+        ORDER BY a.response_days ASC
+        LIMIT 5
+    """
+    return q_dicts(query)
+
+# Figures are rebuilt only when the data they plot changes
+@st.cache_data(ttl=CACHE_TTL)
+def build_pie(responses, pending):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[go.Pie(
+        labels=['Responses Received', 'Pending Responses'],
+        values=[responses, pending],
+        hole=0.4,
+        marker_colors=['#00D9FF', '#FF6B6B']
+    )])
+    fig.update_layout(height=300)
+    return fig
+
+@st.cache_data(ttl=CACHE_TTL)
+def build_timeline(timeline):
+    import plotly.graph_objects as go
+
+    dates, counts = zip(*timeline)
+    fig = go.Figure(go.Scatter(x=dates, y=counts, mode='lines+markers', line_shape='spline'))
+    fig.update_layout(height=300, xaxis_title="Date", yaxis_title="Applications Sent")
+    return fig
+
 # Display KPIs
 stats = get_statistics()
 
@@ -90,32 +255,17 @@ with col1:
     st.subheader("📊 Application Status Distribution")
 
     # Pie chart
-    fig_pie = go.Figure(data=[go.Pie(
-        labels=['Responses Received', 'Pending Responses'],
-        values=[stats['responses'], stats['pending']],
-        hole=0.4,
-        marker_colors=['#00D9FF', '#FF6B6B']
-    )])
-    fig_pie.update_layout(height=300)
+    fig_pie = build_pie(stats['responses'], stats['pending'])
     st.plotly_chart(fig_pie, use_container_width=True)
 
 with col2:
     st.subheader("📅 Applications Timeline (Last 30 Days)")
 
     # Get timeline data
-    query = """
-        SELECT DATE(sent_at) as date, COUNT(*) as count
-        FROM applications
-        WHERE sent_at >= date('now', '-30 days')
-        GROUP BY DATE(sent_at)
-        ORDER BY date
-    """
-    df_timeline = pd.read_sql_query(query, conn)
+    timeline = load_timeline()
 
-    if not df_timeline.empty:
-        fig_timeline = px.line(df_timeline, x='date', y='count',
-                               markers=True, line_shape='spline')
-        fig_timeline.update_layout(height=300, xaxis_title="Date", yaxis_title="Applications Sent")
+    if timeline:
+        fig_timeline = build_timeline(tuple(timeline))
         st.plotly_chart(fig_timeline, use_container_width=True)
     else:
         st.info("No data available for the last 30 days")
@@ -125,21 +275,13 @@ st.markdown("---")
 # Companies needing follow-up
 st.subheader("🔔 Companies Needing Follow-up")
 
-query_followup = """
-    SELECT c.company_name, c.email, c.contact_name, a.sent_at, a.follow_up_count,
-           CAST((julianday('now') - julianday(a.sent_at)) AS INTEGER) as days_ago
-    FROM companies c
-    JOIN applications a ON c.id = a.company_id
-    WHERE a.response_received = 0 AND a.next_follow_up_date <= datetime('now')
-    ORDER BY a.sent_at ASC
-"""
-df_followup = pd.read_sql_query(query_followup, conn)
+followups = load_followups()
 
-if not df_followup.empty:
-    st.dataframe(df_followup, use_container_width=True)
+if followups:
+    st.dataframe(followups, use_container_width=True)
 
     if st.button("📧 Send Follow-up Reminders"):
-        st.success(f"✅ Follow-up reminders scheduled for {len(df_followup)} companies!")
+        st.success(f"✅ Follow-up reminders scheduled for {len(followups)} companies!")
 else:
     st.success("✅ No follow-ups needed today!")
 
@@ -148,44 +290,44 @@ st.markdown("---")
 # Recent applications
 st.subheader("📋 Recent Applications")
 
-query_recent = """
-    SELECT c.company_name, c.email, a.subject, a.sent_at, 
-           CASE WHEN a.response_received = 1 THEN '✅ Responded' ELSE '⏳ Pending' END as status
-    FROM applications a
-    JOIN companies c ON a.company_id = c.id
-    ORDER BY a.sent_at DESC
-    LIMIT 10
-"""
-df_recent = pd.read_sql_query(query_recent, conn)
+recent = load_recent()
 
-if not df_recent.empty:
-    st.dataframe(df_recent, use_container_width=True)
+if recent:
+    st.dataframe(recent, use_container_width=True)
 
 st.markdown("---")
 
 # Job posts section
 st.subheader("🎯 New Job Opportunities")
 
-query_jobs = """
-    SELECT title, company_name, location, url, posted_date, applied
-    FROM job_posts
-    WHERE applied = 0
-    ORDER BY scraped_at DESC
-    LIMIT 5
-"""
-df_jobs = pd.read_sql_query(query_jobs, conn)
-
-if not df_jobs.empty:
-    for idx, row in df_jobs.iterrows():
-        with st.expander(f"📌 {row['title']} - {row['company_name']}"):
-            st.write(f"**Location:** {row['location']}")
-            st.write(f"**Link:** {row['url']}")
-            if st.button(f"Mark as Applied", key=f"apply_{idx}"):
-                cursor = conn.cursor()
-                cursor.execute("UPDATE job_posts SET applied = 1 WHERE url = ?", (row['url'],))
-                conn.commit()
-                st.success("✅ Marked as applied!")
-                st.rerun()
+jobs = load_jobs()
+
+if jobs:
+    with st.form("mark_applied", clear_on_submit=True):
+        apply_queue = []
+        for title, company, location, url, posted_date, applied in jobs:
+            with st.expander(f"📌 {title} - {company}"):
+                st.write(f"**Location:** {location}")
+                st.write(f"**Link:** {url}")
+                if st.checkbox("Mark as Applied", key=f"apply_{url}"):
+                    apply_queue.append(url)
+
+        # All ticked jobs are written in one statement and one commit
+        if st.form_submit_button("✅ Save Applied Jobs") and apply_queue:
+            with db_lock:
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany("UPDATE job_posts SET applied = 1 WHERE url = ?",
+                                     [(url,) for url in apply_queue])
+                    conn.execute("COMMIT")
+                except BaseException:
+                    # The connection is shared by every session: never leave it mid-transaction
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+            st.cache_data.clear()
+            st.success(f"✅ Marked {len(apply_queue)} job(s) as applied!")
+            st.rerun()
 else:
     st.info("No new job opportunities found. Scraper will check again soon!")
 
@@ -194,22 +336,30 @@ st.markdown("---")
 # Top performers
 st.subheader("🏆 Top Responding Companies")
 
-query_top = """
-    SELECT c.company_name, c.field, 
-           CAST((julianday(a.response_date) - julianday(a.sent_at)) AS INTEGER) as response_days
-    FROM companies c
-    JOIN applications a ON c.id = a.company_id
-    WHERE a.response_received = 1
-    ORDER BY response_days ASC
-    LIMIT 5
-"""
-df_top = pd.read_sql_query(query_top, conn)
-
-if not df_top.empty:
-    st.dataframe(df_top, use_container_width=True)
+top = load_top()
+
+if top:
+    st.dataframe(top, use_container_width=True)
 else:
     st.info("No responses yet. Keep applying!")
 
+st.markdown("---")
+
+# AI email improvement
+st.subheader("✍️ Improve an Application Email")
+
+with st.form("improve_email"):
+    draft = st.text_area("Email draft", height=200)
+    improve_col1, improve_col2, improve_col3 = st.columns(3)
+    improve_company = improve_col1.text_input("Company")
+    improve_recipient = improve_col2.text_input("Recipient")
+    improve_position = improve_col3.text_input("Position")
+    improve_submitted = st.form_submit_button("Improve Email")
+
+if improve_submitted and draft.strip():
+    reviewer = get_reviewer()
+    st.write_stream(reviewer.improve_email_stream(draft, improve_company, improve_recipient, improve_position))
+
 # Sidebar - Quick Actions
 with st.sidebar:
     st.header("⚡ Quick Actions")
@@ -223,29 +373,44 @@ with st.sidebar:
         priority = st.slider("Priority", 1, 5, 3)
 
         if st.form_submit_button("Add Company"):
-            cursor = conn.cursor()
-            try:
-                cursor.execute("""
+            # A duplicate email inserts nothing instead of raising IntegrityError
+            with db_lock:
+                inserted = conn.execute("""
                     INSERT INTO companies (company_name, email, contact_name, field, priority)
                     VALUES (?, ?, ?, ?, ?)
-                """, (company_name, email, contact_name, field, priority))
-                conn.commit()
+                    ON CONFLICT DO NOTHING
+                """, (company_name, email, contact_name, field, priority)).rowcount
+            if inserted:
+                st.cache_data.clear()
                 st.success(f"✅ {company_name} added!")
-            except sqlite3.IntegrityError:
+            else:
                 st.error("Company already exists!")
 
     st.markdown("---")
 
     st.subheader("📊 Export Data")
     if st.button("Download CSV Report"):
-        df_export = pd.read_sql_query("SELECT * FROM applications", conn)
-        csv = df_export.to_csv(index=False)
+        # Rows go straight from the cursor into the CSV buffer, no DataFrame copy
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        with db_lock:
+            export_cursor = conn.execute("SELECT * FROM applications")
+            writer.writerow([column[0] for column in export_cursor.description])
+            writer.writerows(export_cursor)
         st.download_button(
             label="📥 Download CSV",
-            data=csv,
+            data=buffer.getvalue().encode("utf-8"),
             file_name=f"internship_report_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
 
+    st.markdown("---")
+
+    st.subheader("🧠 AI Response Cache")
+    cache_stats = get_exact_cache().stats()
+    cache_col1, cache_col2 = st.columns(2)
+    cache_col1.metric("Hits", cache_stats['hits'])
+    cache_col2.metric("Misses", cache_stats['misses'])
+
     st.markdown("---")
     st.info("💡 **Tip:** Check this dashboard daily to stay on top of your applications!")
\ No newline at end of file
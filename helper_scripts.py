@@ -4,13 +4,31 @@ Helper scripts for n8n workflow integration
 These scripts are called by n8n nodes
 """
 
+import asyncio
+import atexit
+import binascii
+import imaplib
 import psycopg2
+from psycopg2.extras import execute_values
 import json
+import re
 import sys
+import threading
+import time
+from email.parser import BytesHeaderParser
+from email.policy import default as _default_policy
+from email.utils import parseaddr
+from urllib.parse import quote, urlencode
 from datetime import datetime, timedelta
 import os
+import quopri
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # stdlib json fallback in _emit
+    orjson = None
+
 load_dotenv()
 
 # PostgreSQL connection parameters
@@ -20,22 +38,118 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Gmail drops an IDLE after ~30 minutes, so it is re-issued before that
+IDLE_TIMEOUT = 29 * 60
+IDLE_RECONNECT_DELAY = 30
+# The shared check_responses session is NOOPed this often while idle
+IMAP_KEEPALIVE_INTERVAL = 25 * 60
+
+# LinkedIn job searches, fetched concurrently (adjust based on your location/field)
+LINKEDIN_SEARCH_URLS = [
+    "https://www.linkedin.com/jobs/search/?" + urlencode({"keywords": keywords, "location": "Morocco"}, quote_via=quote)
+    for keywords in ("stage pfe informatique", "stage pfe développement logiciel", "stage pfe data")
+]
+LINKEDIN_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+SCRAPE_TIMEOUT = 10
+
+# Sender addresses per IMAP SEARCH command
+IMAP_SEARCH_CHUNK = 20
+# Buffered response rows written per UPDATE/INSERT pair
+RESPONSE_FLUSH_ROWS = 100
+# Bytes of a response's text part downloaded for sentiment (only 500 chars are stored)
+IMAP_BODY_BYTES = 8192
+# IMAP dates need English month names whatever the locale
+_IMAP_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# Report counters are reused for this long unless the change token moves
+REPORT_CACHE_TTL = 60
+# Newest application / response ids: two primary-key lookups, changes on every insert
+_CHANGE_TOKEN_SQL = "SELECT (SELECT MAX(id) FROM applications), (SELECT MAX(id) FROM responses)"
+_report_cache = {"token": None, "expires_at": 0.0, "counters": None}
+_pending_cache = {"token": None, "apps": {}}
+# Highest UID already examined, valid only for the mailbox's current UIDVALIDITY
+_last_seen = {"uidvalidity": None, "uid": 0}
+
+# IMAP FETCH response parsing: start of a message and each returned section
+_FETCH_START_RE = re.compile(rb"^\d+ \(")
+_FETCH_SECTION_RE = re.compile(rb"BODY\[([^\]]*)\](?:<\d+>)? \{\d+\}$")
+# policy=default hands back RFC 2047-decoded str headers, so no decode_header pass
+_HEADER_PARSER = BytesHeaderParser(policy=_default_policy)
+_FETCH_LITERAL_RE = re.compile(rb"\{\d+\}$")
+_SEXP_TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+# Sentiment keywords, matched in one pass over the text
+_SENTIMENT_KEYWORDS = {
+    "Positive": ["interested", "interview", "pleased", "love", "excited",
+                 "opportunity", "congratulations", "selected"],
+    "Negative": ["unfortunately", "sorry", "not", "cannot", "unable",
+                 "filled", "closed", "regret"],
+}
+_KEYWORD_CLASS = {word: cls for cls, words in _SENTIMENT_KEYWORDS.items() for word in words}
+
+try:
+    import ahocorasick
+
+    _SENTIMENT_AUTOMATON = ahocorasick.Automaton()
+    for _word, _cls in _KEYWORD_CLASS.items():
+        _SENTIMENT_AUTOMATON.add_word(_word, (_cls, _word))
+    _SENTIMENT_AUTOMATON.make_automaton()
+    _SENTIMENT_RE = None
+except ImportError:
+    _SENTIMENT_AUTOMATON = None
+    # Lookahead so overlapping keywords ("cannot" / "not") are all found
+    _SENTIMENT_RE = re.compile("(?=(" + "|".join(map(re.escape, _KEYWORD_CLASS)) + "))")
+
+
+# One connection per process, shared by every script below
+_conn = None
+
+
 def get_conn():
-    return psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
-    )
+    """
+    Return the module-level connection, opening it on first use
+    Session settings: no fsync wait per commit, fail fast on row locks
+    """
+    global _conn
+    if _conn is None or _conn.closed:
+        _conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            options="-c synchronous_commit=off -c lock_timeout=5000"
+        )
+    return _conn
+
+
+@atexit.register
+def _close_conn():
+    if _conn is not None and not _conn.closed:
+        _conn.close()
+
+
+def _emit(result):
+    """Write one compact JSON line to stdout for n8n"""
+    if orjson is not None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_APPEND_NEWLINE))
+        sys.stdout.buffer.flush()
+    else:
+        json.dump(result, sys.stdout, separators=(",", ":"))
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+
 
 # ==================== SCRIPT 1: Check Follow-ups ====================
-def check_followups():
+def check_followups(conn=None):
     """
     Check which companies need follow-up
     Returns JSON for n8n
     """
-    conn = get_conn()
+    conn = conn or get_conn()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -52,10 +166,11 @@ def check_followups():
 
     companies = cursor.fetchall()
     cursor.close()
-    conn.close()
+    conn.commit()  # end the read transaction on the shared connection
 
     companies_list = []
     for comp in companies:
+        days_ago = int(comp[6]) if comp[6] is not None else None
         companies_list.append({
             "id": comp[0],
             "name": comp[1],
@@ -63,144 +178,469 @@ def check_followups():
             "contact": comp[3] or "Hiring Manager",
             "sent_date": comp[4].isoformat() if comp[4] else None,
             "follow_up_count": comp[5],
-            "days_ago": int(comp[6]) if comp[6] is not None else None
+            "days_ago": days_ago
         })
 
     result = {
         "followups_needed": len(companies_list),
-        "companies": companies_list,
-        "companies_list": "\n".join([
-            f"• {c['name']} ({c['email']}) - {c['days_ago']} days ago"
-            for c in companies_list
-        ])
+        "companies": companies_list
     }
 
-    print(json.dumps(result))
+    _emit(result)
     return result
 
 
 # ==================== SCRIPT 2: Check Responses ====================
-def check_responses():
+def check_responses(conn=None):
     """
     Check Gmail for responses and update database
     Returns JSON for n8n
     """
-    import imaplib
-    import email
-    from email.header import decode_header
-
-    # Email credentials (use environment variables in production)
-    EMAIL = os.getenv("EMAIL")
-    PASSWORD = os.getenv("EMAIL_PASSWORD")
-
-    conn = get_conn()
-    cursor = conn.cursor()
-
-    # Get list of companies we've contacted
-    cursor.execute("""
-        SELECT c.email, a.id, a.sent_at
-        FROM companies c
-        JOIN applications a ON c.id = a.company_id
-        WHERE a.response_received = FALSE
-    """)
-    pending_apps = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
-
+    conn = conn or get_conn()
     new_responses = []
 
     try:
-        # Connect to Gmail
-        mail = imaplib.IMAP4_SSL("imap.gmail.com")
-        mail.login(EMAIL, PASSWORD)
-        mail.select("inbox")
-
-        # Search for unread emails
-        status, messages = mail.search(None, 'UNSEEN')
-
-        for email_id in messages[0].split()[-50:]:  # Check last 50 unread
-            status, msg_data = mail.fetch(email_id, "(RFC822)")
-            msg = email.message_from_bytes(msg_data[0][1])
-
-            sender = msg.get("From")
-            subject = msg.get("Subject")
-
-            # Extract email address from sender
-            sender_email = sender.split("<")[-1].replace(">", "").strip() if "<" in sender else sender
-
-            # Check if this is from a company we contacted
-            if sender_email in pending_apps:
-                app_id, sent_date = pending_apps[sender_email]
-
-                # Get email body
-                body = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            try:
-                                body = part.get_payload(decode=True).decode()
-                            except:
-                                body = "Could not decode body"
-                            break
-                else:
-                    try:
-                        body = msg.get_payload(decode=True).decode()
-                    except:
-                        body = "Could not decode body"
-
-                # Analyze sentiment (simple keyword-based)
-                sentiment = analyze_sentiment(subject + " " + body)
-
-                # Update database
-                cursor.execute("""
-                    UPDATE applications 
-                    SET response_received = TRUE, response_date = NOW()
-                    WHERE id = %s
-                """, (app_id,))
-
-                cursor.execute("""
-                    INSERT INTO responses (application_id, subject, body, sentiment)
-                    VALUES (%s, %s, %s, %s)
-                """, (app_id, subject, body[:500], sentiment))
-
-                new_responses.append({
-                    "company_email": sender_email,
-                    "subject": subject,
-                    "sentiment": sentiment,
-                    "application_id": app_id
-                })
-
-        conn.commit()
-        mail.close()
-        mail.logout()
+        with _imap_lock:
+            new_responses = _process_inbox(_get_imap(), conn)
 
     except Exception as e:
+        conn.rollback()
+        if isinstance(e, (imaplib.IMAP4.error, OSError)):
+            with _imap_lock:
+                _drop_imap()
         print(f"Error checking emails: {e}", file=sys.stderr)
 
-    cursor.close()
-    conn.close()
-
     result = {
         "new_responses": len(new_responses),
         "responses": new_responses
     }
 
-    print(json.dumps(result))
+    _emit(result)
     return result
 
 
-def analyze_sentiment(text):
+def _imap_login():
+    """Open an IMAP session on the Gmail inbox"""
+    mail = imaplib.IMAP4_SSL("imap.gmail.com")
+    mail.login(os.getenv("EMAIL"), os.getenv("EMAIL_PASSWORD"))
+    mail.select("inbox")
+
+    # UIDs only stay comparable while UIDVALIDITY is unchanged
+    _, (uidvalidity,) = mail.response("UIDVALIDITY")
+    if uidvalidity != _last_seen["uidvalidity"]:
+        _last_seen.update(uidvalidity=uidvalidity, uid=0)
+    return mail
+
+
+def _get_imap():
     """
-    Simple sentiment analysis
-    In production, use NLP library or API
+    Return the shared IMAP session, logging in on first use or after it dropped
+    Caller must hold _imap_lock
+    """
+    global _imap
+    if _imap is not None:
+        try:
+            _imap.noop()
+            return _imap
+        except (imaplib.IMAP4.error, OSError):
+            _drop_imap()
+
+    _imap = _imap_login()
+    if not _imap_keepalive.is_alive():
+        _imap_keepalive.start()
+    return _imap
+
+
+def _logout(mail):
+    """Log out of an IMAP session, ignoring one that is already gone"""
+    if mail is not None:
+        try:
+            mail.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+
+
+def _drop_imap():
+    """Log out of the shared IMAP session, ignoring a connection that is already gone"""
+    global _imap
+    _logout(_imap)
+    _imap = None
+
+
+def _imap_keepalive_loop():
+    """NOOP the shared session so Gmail does not drop it between polls"""
+    while True:
+        time.sleep(IMAP_KEEPALIVE_INTERVAL)
+        with _imap_lock:
+            if _imap is not None:
+                try:
+                    _imap.noop()
+                except (imaplib.IMAP4.error, OSError):
+                    _drop_imap()
+
+
+# One IMAP session per process, reused by every check_responses call
+_imap = None
+_imap_lock = threading.Lock()
+_imap_keepalive = threading.Thread(target=_imap_keepalive_loop, daemon=True)
+
+
+@atexit.register
+def _close_imap():
+    with _imap_lock:
+        _drop_imap()
+
+
+def _process_inbox(mail, conn):
+    """
+    Match unread mail against pending applications and record the responses
+    Returns the list of new responses
+    """
+    # This pass covers every mail announced so far; later notices pile up afresh
+    _pop_new_mail(mail)
+
+    cursor = conn.cursor()
+
+    # Get list of companies we've contacted
+    pending_apps = _pending_applications(cursor)
+    uids = _search_candidates(mail, pending_apps)
+
+    new_responses = []
+    response_rows = []
+    seen = []
+
+    # Responses stream in one at a time and are written every RESPONSE_FLUSH_ROWS,
+    # all inside one transaction
+    for response in iter_responses(mail, uids, pending_apps):
+        response_rows.append((response["application_id"], response["subject"],
+                              response["body"][:500], response["sentiment"]))
+        if len(response_rows) >= RESPONSE_FLUSH_ROWS:
+            _save_responses(cursor, response_rows)
+            response_rows = []
+
+        seen.append(response["uid"])
+        new_responses.append({
+            "company_email": response["company_email"],
+            "subject": response["subject"],
+            "sentiment": response["sentiment"],
+            "application_id": response["application_id"]
+        })
+
+    _save_responses(cursor, response_rows)
+    conn.commit()
+    if uids:
+        _last_seen["uid"] = int(uids[-1])
+
+    # Flag only the processed responses as read
+    if seen:
+        mail.uid("STORE", b",".join(seen).decode(), "+FLAGS", "(\\Seen)")
+
+    cursor.close()
+    return new_responses
+
+
+def _pop_new_mail(mail):
+    """
+    Clear the EXISTS/RECENT notices imaplib has collected (otherwise they grow forever)
+    Returns True if any were pending
+    """
+    exists = mail.untagged_responses.pop("EXISTS", None)
+    mail.untagged_responses.pop("RECENT", None)
+    return bool(exists)
+
+
+def _search_candidates(mail, pending_apps):
+    """
+    UIDs of unread mail that may be replies, oldest first, at most 50
+    The server filters on the senders we wait on, on mail newer than anything
+    already examined and no older than our oldest application
+    """
+    uids = set()
+    emails = list(pending_apps)
+    criteria = ["UNSEEN", f"UID {_last_seen['uid'] + 1}:*"]
+    sent_dates = [sent_at for _, sent_at in pending_apps.values() if sent_at]
+    if sent_dates:
+        since = min(sent_dates)
+        criteria.append(f"SINCE {since.day:02d}-{_IMAP_MONTHS[since.month - 1]}-{since.year}")
+    for i in range(0, len(emails), IMAP_SEARCH_CHUNK):
+        status, messages = mail.uid("SEARCH", None, *criteria, _from_any(emails[i:i + IMAP_SEARCH_CHUNK]))
+        uids.update(messages[0].split())
+    # "n:*" still matches the newest message when n is past the end, hence the filter;
+    # oldest first so anything beyond 50 is picked up by the next pass
+    return sorted((uid for uid in uids if int(uid) > _last_seen["uid"]), key=int)[:50]
+
+
+def iter_responses(mail, uids, pending_apps):
+    """
+    Yield one dict per message in uids sent by a company we are waiting on
+    Keys: uid, company_email, application_id, subject, body, sentiment
+    Bodies are fetched one part-number group at a time, so only that group is held in memory
+    """
+    # Headers and MIME layout of every candidate in one round-trip (PEEK leaves them unread)
+    headers = _uid_fetch(mail, uids, "(BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT)])")
+
+    matched = {}
+    for uid, sections in headers.items():
+        header = _HEADER_PARSER.parsebytes(
+            b"".join(data for name, data in sections.items() if name.upper().startswith("HEADER"))
+        )
+        subject = header.get("Subject")
+        subject = str(subject) if subject is not None else None
+
+        # Extract email address from sender (already parsed by the policy); the
+        # policy's parser can raise on malformed values, so fall back to the raw header
+        try:
+            addresses = getattr(header.get("From"), "addresses", ())
+            sender_email = addresses[0].addr_spec.lower() if addresses else ""
+        except (IndexError, AttributeError, ValueError, TypeError):
+            raw_from = next((value for name, value in header.raw_items() if name.lower() == "from"), "")
+            sender_email = parseaddr(raw_from)[1].lower()
+
+        # Check if this is from a company we contacted
+        if sender_email in pending_apps:
+            matched[uid] = (sender_email, subject, _text_part(sections.get("BODYSTRUCTURE")))
+
+    def response(uid, payload=b""):
+        sender_email, subject, text_part = matched[uid]
+        app_id, sent_date = pending_apps[sender_email]
+        body = _decode_text(payload, text_part[1], text_part[2]) if payload else ""
+        return {
+            "uid": uid,
+            "company_email": sender_email,
+            "application_id": app_id,
+            "subject": subject,
+            "body": body,
+            # Analyze sentiment (simple keyword-based)
+            "sentiment": analyze_sentiment(subject, body)
+        }
+
+    # Only the text part of each matched message, never attachments;
+    # one round-trip per distinct part number (usually just "1" or "1.1")
+    by_section = {}
+    for uid, (_, _, text_part) in matched.items():
+        by_section.setdefault(text_part[0] if text_part else None, []).append(uid)
+
+    for section, section_uids in by_section.items():
+        if section is None:
+            for uid in section_uids:
+                yield response(uid)
+            continue
+
+        items = f"(BODY.PEEK[{section}]<0.{IMAP_BODY_BYTES}>)"
+        bodies = _uid_fetch(mail, section_uids, items)
+        for uid in section_uids:
+            yield response(uid, bodies.get(uid, {}).get(section, b""))
+
+
+def _save_responses(cursor, response_rows):
+    """Record (application_id, subject, body, sentiment) rows: one UPDATE and one INSERT"""
+    if not response_rows:
+        return
+
+    cursor.execute("""
+        UPDATE applications 
+        SET response_received = TRUE, response_date = NOW()
+        WHERE id = ANY(%s)
+    """, ([row[0] for row in response_rows],))
+
+    execute_values(cursor, """
+        INSERT INTO responses (application_id, subject, body, sentiment)
+        VALUES %s
+    """, response_rows)
+
+
+def _from_any(addresses):
+    """
+    IMAP search key matching mail from any of the addresses
+    e.g. OR OR FROM "a" FROM "b" FROM "c"
+    """
+    keys = ['FROM "%s"' % a.replace("\\", "\\\\").replace('"', '\\"') for a in addresses]
+    return "OR " * (len(keys) - 1) + " ".join(keys)
+
+
+def _pending_applications(cursor):
+    """
+    Map lower-cased company email -> (application id, sent_at) for unanswered applications
+    Only re-read when the count or newest id of pending applications changes
+    """
+    cursor.execute("SELECT COUNT(*), MAX(id) FROM applications WHERE response_received = FALSE")
+    token = cursor.fetchone()
+
+    if token != _pending_cache["token"]:
+        cursor.execute("""
+            SELECT c.email, a.id, a.sent_at
+            FROM companies c
+            JOIN applications a ON c.id = a.company_id
+            WHERE a.response_received = FALSE
+        """)
+        _pending_cache.update(token=token, apps={row[0].lower(): (row[1], row[2]) for row in cursor.fetchall()})
+
+    return _pending_cache["apps"]
+
+
+def _uid_fetch(mail, uids, items):
+    """
+    Fetch items for many messages with a single UID FETCH command
+    Returns {uid: {section: bytes}}, e.g. {b"42": {"": raw_message}}
+    A requested BODYSTRUCTURE is returned parsed, under the "BODYSTRUCTURE" key
+    """
+    if not uids:
+        return {}
+
+    status, data = mail.uid("FETCH", b",".join(uids).decode(), items)
+
+    results = {}
+    messages = []
+    current = None
+    for part in data:
+        meta = part[0] if isinstance(part, tuple) else part
+        if not isinstance(meta, bytes):
+            continue
+
+        if _FETCH_START_RE.match(meta):
+            current = {"sections": {}, "text": b""}
+            messages.append(current)
+        if current is None:
+            continue
+
+        section = _FETCH_SECTION_RE.search(meta)
+        if isinstance(part, tuple) and section:
+            current["sections"][section.group(1).decode()] = part[1]
+            current["text"] += meta
+        elif isinstance(part, tuple):
+            # A literal inside BODYSTRUCTURE (e.g. an odd filename): inline it as a quoted string
+            quoted = b'"' + part[1].replace(b"\\", b"\\\\").replace(b'"', b'\\"') + b'"'
+            current["text"] += _FETCH_LITERAL_RE.sub(lambda _: quoted, meta)
+        else:
+            current["text"] += meta
+
+    for message in messages:
+        uid, structure = _fetch_attributes(message["text"])
+        if uid is None:
+            continue
+        if structure is not None:
+            message["sections"]["BODYSTRUCTURE"] = structure
+        results[uid] = message["sections"]
+
+    return results
+
+
+def _fetch_attributes(text):
+    """
+    Find UID and BODYSTRUCTURE among the top-level items of one FETCH response
+    Only the item list itself is searched, never nested lists or quoted strings
+    Returns (uid, parsed BODYSTRUCTURE), either may be None
+    """
+    uid = structure = previous = None
+    depth = 0
+    for match in _SEXP_TOKEN_RE.finditer(text):
+        token = match.group()
+        if token == b"(":
+            if depth == 1 and previous == b"BODYSTRUCTURE" and structure is None:
+                structure = _parse_sexp(text[match.start():])
+            depth += 1
+            previous = None
+        elif token == b")":
+            depth -= 1
+        elif depth == 1:
+            if previous == b"UID" and token.isdigit():
+                uid = token
+            previous = token.upper()
+    return uid, structure
+
+
+def _parse_sexp(data):
     """
-    positive_keywords = ["interested", "interview", "pleased", "love", "excited",
-                         "opportunity", "congratulations", "selected"]
-    negative_keywords = ["unfortunately", "sorry", "not", "cannot", "unable",
-                         "filled", "closed", "regret"]
+    Parse one IMAP parenthesized list into nested lists
+    Strings and atoms become str, NIL becomes None
+    """
+    stack = [[]]
+    for token in _SEXP_TOKEN_RE.findall(data):
+        if token == b"(":
+            stack.append([])
+        elif token == b")":
+            done = stack.pop()
+            stack[-1].append(done)
+            if len(stack) == 1:
+                break
+        elif token.startswith(b'"'):
+            stack[-1].append(re.sub(rb"\\(.)", rb"\1", token[1:-1]).decode(errors="replace"))
+        else:
+            stack[-1].append(None if token.upper() == b"NIL" else token.decode(errors="replace"))
+    return stack[0][0] if stack[0] else None
+
+
+def _text_part(structure, section=""):
+    """
+    Find the first text/plain part in a parsed BODYSTRUCTURE
+    Returns (part number, transfer encoding, charset), or None if there is none
+    A single-part message is always part "1", whatever its type
+    """
+    if not structure:
+        return None
+
+    if isinstance(structure[0], list):
+        # Multipart: child parts first, then the subtype and extension data
+        for number, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            found = _text_part(child, f"{section}.{number}" if section else str(number))
+            if found:
+                return found
+        return None
+
+    # Nested parts only count if they are text/plain
+    if section and ((structure[0] or "").lower(), (structure[1] or "").lower()) != ("text", "plain"):
+        return None
+
+    params = structure[2] if isinstance(structure[2], list) else []
+    charset = next((params[i + 1] for i in range(0, len(params) - 1, 2) if (params[i] or "").lower() == "charset"), None)
+    encoding = structure[5] if len(structure) > 5 and isinstance(structure[5], str) else "7bit"
+    return section or "1", encoding.lower(), charset
+
+
+def _decode_text(payload, encoding, charset):
+    """
+    Decode a fetched MIME part using its transfer encoding and declared charset
+    Undecodable bytes are replaced rather than raising
+    """
+    if encoding == "base64":
+        # A partial fetch can end mid-quantum: keep whole 4-character groups only
+        payload = re.sub(rb"\s+", b"", payload)
+        payload = payload[:len(payload) // 4 * 4]
+        try:
+            payload = binascii.a2b_base64(payload)
+        except binascii.Error:
+            pass
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+
+    charset = charset or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:  # unknown charset name
+        return payload.decode("utf-8", errors="replace")
 
-    text_lower = text.lower()
 
-    positive_count = sum(1 for word in positive_keywords if word in text_lower)
-    negative_count = sum(1 for word in negative_keywords if word in text_lower)
+def analyze_sentiment(*texts):
+    """
+    Simple sentiment analysis
+    Takes one or more texts (e.g. subject, body), scanned in turn without joining
+    In production, use NLP library or API
+    """
+    # Each keyword counts once, however often it appears
+    matched = set()
+    for text in texts:
+        if not text:
+            continue
+        text_lower = text.lower()
+        if _SENTIMENT_AUTOMATON is not None:
+            matched.update(hit for _, hit in _SENTIMENT_AUTOMATON.iter(text_lower))
+        else:
+            matched.update((_KEYWORD_CLASS[m.group(1)], m.group(1)) for m in _SENTIMENT_RE.finditer(text_lower))
+
+    positive_count = sum(1 for cls, _ in matched if cls == "Positive")
+    negative_count = len(matched) - positive_count
 
     if positive_count > negative_count:
         return "Positive"
@@ -210,43 +650,132 @@ def analyze_sentiment(text):
         return "Neutral"
 
 
+# ==================== SCRIPT 2b: Watch Responses (IMAP IDLE) ====================
+def watch_responses(conn=None, idle_timeout=IDLE_TIMEOUT):
+    """
+    Keep one IMAP session open and yield check_responses results as mail arrives
+    The server pushes new-mail notices (IDLE), so quiet inboxes cost no LOGIN/SEARCH
+    """
+    conn = conn or get_conn()
+
+    mail = None
+    try:
+        while True:
+            try:
+                mail = _imap_login()
+
+                # Catch up on anything that arrived while disconnected; afterwards each
+                # wake-up only searches UIDs above the last one examined (_last_seen)
+                while True:
+                    new_responses = _process_inbox(mail, conn)
+                    if new_responses:
+                        yield {"new_responses": len(new_responses), "responses": new_responses}
+
+                    # Mail announced while the inbox was being processed is handled right
+                    # away; otherwise idle (a timeout just renews IDLE, no SEARCH)
+                    if not _pop_new_mail(mail):
+                        while not _idle_wait(mail, idle_timeout):
+                            pass
+
+            except (imaplib.IMAP4.error, OSError) as e:
+                print(f"IMAP connection lost, reconnecting: {e}", file=sys.stderr)
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(f"Error saving responses: {e}", file=sys.stderr)
+
+            _logout(mail)
+            mail = None
+            time.sleep(IDLE_RECONNECT_DELAY)
+    finally:
+        _logout(mail)
+
+
+def _idle_wait(mail, timeout):
+    """
+    Block in IMAP IDLE until the mailbox reports new mail or timeout elapses
+    Returns True if an EXISTS notification arrived
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b" IDLE\r\n")
+
+    # Read the raw socket while idling: a timeout on imaplib's buffered file
+    # would leave it unusable, a timeout on the socket itself is harmless.
+    # The "+ idling" continuation is read here too, so an EXISTS that arrives
+    # in the same packet is not left behind in imaplib's buffer.
+    deadline = time.monotonic() + timeout
+    pending = b""
+    idling = False
+    new_mail = False
+    try:
+        while not new_mail:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            mail.sock.settimeout(remaining)
+            chunk = mail.sock.recv(4096)
+            if not chunk:
+                raise imaplib.IMAP4.abort("connection closed during IDLE")
+            pending += chunk
+            *lines, pending = pending.split(b"\r\n")
+            for line in lines:
+                if line.startswith(b"+"):
+                    idling = True
+                elif line.startswith(tag):
+                    raise imaplib.IMAP4.error(f"server refused IDLE: {line.decode(errors='replace')}")
+                elif line.startswith(b"* ") and line.endswith(b" EXISTS"):
+                    new_mail = True
+    except TimeoutError:
+        pass
+    finally:
+        mail.sock.settimeout(None)
+
+    if not idling:
+        raise imaplib.IMAP4.abort("no IDLE continuation from server")
+
+    mail.send(b"DONE\r\n")
+    while True:
+        line = mail.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("connection closed while ending IDLE")
+        if line.startswith(tag + b" "):
+            if not line[len(tag) + 1:].upper().startswith(b"OK"):
+                raise imaplib.IMAP4.error(f"IDLE failed: {line.decode(errors='replace').strip()}")
+            break
+        # Mail that arrived between the timeout and DONE still counts
+        if line.startswith(b"* ") and line.rstrip().endswith(b" EXISTS"):
+            new_mail = True
+
+    return new_mail
+
+
 # ==================== SCRIPT 3: Generate Report ====================
-def generate_report():
+def generate_report(conn=None):
     """
     Generate statistics report
     Returns formatted text for email
     """
-    conn = get_conn()
+    conn = conn or get_conn()
     cursor = conn.cursor()
 
-    # Total applications
-    cursor.execute("SELECT COUNT(*) FROM applications")
-    total = cursor.fetchone()[0]
-
-    # Responses
-    cursor.execute("SELECT COUNT(*) FROM applications WHERE response_received = TRUE")
-    responses = cursor.fetchone()[0]
-
-    # Positive responses
-    cursor.execute("""
-        SELECT COUNT(*) FROM responses WHERE sentiment = 'Positive'
-    """)
-    positive = cursor.fetchone()[0]
+    # All counters in one pass over applications, skipped while nothing has changed
+    cursor.execute(_CHANGE_TOKEN_SQL)
+    token = cursor.fetchone()
+    if token != _report_cache["token"] or time.monotonic() >= _report_cache["expires_at"]:
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE response_received = TRUE),
+                   COUNT(*) FILTER (WHERE response_received = FALSE AND next_follow_up_date <= NOW()),
+                   COUNT(DISTINCT company_id),
+                   (SELECT COUNT(*) FROM responses WHERE sentiment = 'Positive')
+            FROM applications
+        """)
+        _report_cache.update(token=token, expires_at=time.monotonic() + REPORT_CACHE_TTL,
+                             counters=cursor.fetchone())
+    total, responses, followups, companies, positive = _report_cache["counters"]
 
     # Pending
     pending = total - responses
 
-    # Follow-ups needed
-    cursor.execute("""
-        SELECT COUNT(*) FROM applications 
-        WHERE response_received = FALSE AND next_follow_up_date <= NOW()
-    """)
-    followups = cursor.fetchone()[0]
-
-    # Companies contacted
-    cursor.execute("SELECT COUNT(DISTINCT company_id) FROM applications")
-    companies = cursor.fetchone()[0]
-
     # Recent positive responses
     cursor.execute("""
         SELECT c.company_name, r.subject, r.received_at
@@ -270,7 +799,7 @@ def generate_report():
     timeline = cursor.fetchall()
 
     cursor.close()
-    conn.close()
+    conn.commit()
 
     response_rate = (responses / total * 100) if total > 0 else 0
 
@@ -341,91 +870,114 @@ Your Automation System 🤖
 """
 
     result = {"report": report}
-    print(json.dumps(result))
+    _emit(result)
     return result
 
 
 # ==================== SCRIPT 4: Job Post Scraper ====================
-def scrape_linkedin_jobs():
+async def _scrape_pages(urls):
     """
-    Scrape LinkedIn for PFE internship posts
-    Returns JSON with new job posts
+    Download every search page concurrently and parse each in a worker thread
+    Returns one list of jobs (or the exception raised) per URL
     """
-    import requests
-    from bs4 import BeautifulSoup
+    import aiohttp
 
-    # LinkedIn job search URL (adjust based on your location/field)
-    url = "https://www.linkedin.com/jobs/search/?keywords=stage%20pfe%20informatique&location=Morocco"
+    loop = asyncio.get_running_loop()
+    timeout = aiohttp.ClientTimeout(total=SCRAPE_TIMEOUT)
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
+    async with aiohttp.ClientSession(headers=LINKEDIN_HEADERS, timeout=timeout) as session:
+        async def fetch_and_parse(url):
+            async with session.get(url) as response:
+                html = await response.text()
+            return await loop.run_in_executor(None, _parse_job_cards, html)
+
+        return await asyncio.gather(*(fetch_and_parse(url) for url in urls), return_exceptions=True)
+
+
+def _parse_job_cards(html):
+    """Extract the first 10 job cards of a LinkedIn search page"""
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+
+    jobs = []
+    job_cards = tree.css('div.base-card')
+
+    for card in job_cards[:10]:  # Get first 10 jobs
+        try:
+            title_elem = card.css_first('h3.base-search-card__title')
+            company_elem = card.css_first('h4.base-search-card__subtitle')
+            location_elem = card.css_first('span.job-search-card__location')
+            link_elem = card.css_first('a.base-card__full-link')
+
+            if title_elem and company_elem and link_elem:
+                job = {
+                    "title": title_elem.text(strip=True),
+                    "company": company_elem.text(strip=True),
+                    "location": location_elem.text(strip=True) if location_elem else "Remote",
+                    "url": link_elem.attributes['href'],
+                    "source": "LinkedIn",
+                    "description": ""
+                }
+                jobs.append(job)
+        except Exception:
+            continue
+
+    return jobs
+
+
+def scrape_linkedin_jobs(conn=None):
+    """
+    Scrape LinkedIn for PFE internship posts
+    Returns JSON with new job posts
+    """
+    from internship_mg import insert_job_posts
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        # All searches in flight at once; each page is parsed as soon as it arrives
+        pages = asyncio.run(_scrape_pages(LINKEDIN_SEARCH_URLS))
 
         jobs = []
-        job_cards = soup.find_all('div', class_='base-card')
-
-        for card in job_cards[:10]:  # Get first 10 jobs
-            try:
-                title_elem = card.find('h3', class_='base-search-card__title')
-                company_elem = card.find('h4', class_='base-search-card__subtitle')
-                location_elem = card.find('span', class_='job-search-card__location')
-                link_elem = card.find('a', class_='base-card__full-link')
-
-                if title_elem and company_elem and link_elem:
-                    job = {
-                        "title": title_elem.text.strip(),
-                        "company": company_elem.text.strip(),
-                        "location": location_elem.text.strip() if location_elem else "Remote",
-                        "url": link_elem['href'],
-                        "source": "LinkedIn",
-                        "description": ""
-                    }
-                    jobs.append(job)
-            except Exception:
+        for url, page in zip(LINKEDIN_SEARCH_URLS, pages):
+            if isinstance(page, Exception):
+                print(f"Error scraping {url}: {page}", file=sys.stderr)
                 continue
+            jobs.extend(page)
+        if all(isinstance(page, Exception) for page in pages):
+            raise pages[0]
 
         # Save to database
-        conn = get_conn()
+        conn = conn or get_conn()
         cursor = conn.cursor()
 
-        new_jobs = []
-        for job in jobs:
-            try:
-                cursor.execute("""
-                    INSERT INTO job_posts (title, company_name, location, url, source)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT (url) DO NOTHING
-                """, (job['title'], job['company'], job['location'], job['url'], job['source']))
-                new_jobs.append(job)
-            except psycopg2.IntegrityError:
-                conn.rollback()
-                pass  # Job already exists
+        # Same bulk insert as InternshipDB.add_job_posts_bulk: one JSON array per
+        # statement, reporting only the URLs actually inserted
+        jobs = list({job['url']: job for job in jobs}.values())
+        inserted_urls = set(insert_job_posts(cursor, jobs))
+        new_jobs = [job for job in jobs if job['url'] in inserted_urls]
 
         conn.commit()
         cursor.close()
-        conn.close()
 
         result = {
             "new_jobs_found": len(new_jobs),
             "jobs": new_jobs
         }
 
-        print(json.dumps(result))
+        _emit(result)
         return result
 
     except Exception as e:
-        print(json.dumps({"error": str(e), "new_jobs_found": 0, "jobs": []}))
+        if conn is not None and not conn.closed:
+            conn.rollback()
+        _emit({"error": str(e), "new_jobs_found": 0, "jobs": []})
         return {"error": str(e), "new_jobs_found": 0, "jobs": []}
 
 
 # ==================== MAIN ====================
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python helper_scripts.py [check_followups|check_responses|generate_report|scrape_jobs]")
+        print("Usage: python helper_scripts.py [check_followups|check_responses|watch_responses|generate_report|scrape_jobs]")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -434,6 +986,10 @@ if __name__ == "__main__":
         check_followups()
     elif command == "check_responses":
         check_responses()
+    elif command == "watch_responses":
+        # Long-running: one JSON line per batch of new responses
+        for result in watch_responses():
+            _emit(result)
     elif command == "generate_report":
         generate_report()
     elif command == "scrape_jobs":
@@ -1,15 +1,138 @@
 import psycopg2
 from psycopg2 import sql
-from datetime import datetime, timedelta
+from psycopg2.extensions import connection as _PgConnection
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import EmailMessage
+from itertools import islice
+from queue import Empty, Queue
+from types import SimpleNamespace
 import json
+import mimetypes
 import os
+import smtplib
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
 # ==================== DATABASE CONNECTION ====================
+def _batches(iterable, size):
+    """Yield lists of up to size items without materializing the whole iterable"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# Bulk job-post insert from a JSON array of add_job_post-style dicts ({jobs} is the
+# placeholder); missing keys become NULL and known URLs are skipped
+_JOB_POSTS_INSERT = """
+    INSERT INTO job_posts (title, company_name, location, description, url, source)
+    SELECT title, company, location, description, url, source
+    FROM json_to_recordset({jobs})
+         AS j(title varchar, company varchar, location varchar,
+              description text, url varchar, source varchar)
+    ON CONFLICT (url) DO NOTHING
+    RETURNING url
+"""
+
+
+def insert_job_posts(cursor, jobs, batch_size=1000, prepared=False):
+    """
+    Insert job post dicts on cursor, one statement per batch_size jobs; the caller commits
+    prepared=True runs InternshipDB's prepared add_job_posts_stmt instead of the plain SQL
+    Returns the URLs actually inserted
+    """
+    statement = "EXECUTE add_job_posts_stmt(%s)" if prepared else _JOB_POSTS_INSERT.format(jobs="%s")
+    urls = []
+    for batch in _batches(jobs, batch_size):
+        cursor.execute(statement, (json.dumps(batch, default=str),))
+        urls.extend(row[0] for row in cursor.fetchall())
+    return urls
+
+
+class _PooledConnection(_PgConnection):
+    """Connection that remembers whether PREPARED_STATEMENTS exist on it"""
+    prepared = False
+
+
 class InternshipDB:
+    # Hot statements, prepared once per session and run with EXECUTE
+    PREPARED_STATEMENTS = {
+        "add_company_stmt": """
+            INSERT INTO companies (company_name, email, contact_name, website, field, priority)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (email) DO NOTHING
+            RETURNING id
+        """,
+        "log_application_stmt": """
+            INSERT INTO applications (company_id, subject, email_body, next_follow_up_date, ai_reviewed)
+            VALUES ($1, $2, $3, CURRENT_TIMESTAMP + INTERVAL '7 days', $4)
+            RETURNING id
+        """,
+        "mark_responded_stmt": """
+            UPDATE applications 
+            SET response_received = TRUE, response_date = NOW()
+            WHERE id = $1
+        """,
+        "add_response_stmt": """
+            INSERT INTO responses (application_id, body, sentiment)
+            VALUES ($1, $2, $3)
+        """,
+        "update_follow_up_stmt": """
+            UPDATE applications 
+            SET follow_up_count = follow_up_count + 1,
+                next_follow_up_date = NOW() + INTERVAL '7 days'
+            WHERE id = $1
+        """,
+        "companies_needing_followup_stmt": """
+            SELECT c.id, c.company_name, c.email, c.contact_name, 
+                   a.sent_at, a.follow_up_count,
+                   EXTRACT(DAY FROM (NOW() - a.sent_at)) as days_ago
+            FROM companies c
+            JOIN applications a ON c.id = a.company_id
+            WHERE a.response_received = FALSE 
+            AND a.next_follow_up_date <= NOW()
+            AND a.follow_up_count < 3
+            ORDER BY c.priority ASC, a.sent_at ASC
+        """,
+        "add_job_post_stmt": """
+            INSERT INTO job_posts (title, company_name, location, description, url, source)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (url) DO NOTHING
+            RETURNING id
+        """,
+        # The whole batch is one JSON array: the same plan serves every batch size
+        "add_job_posts_stmt": _JOB_POSTS_INSERT.format(jobs="$1::json"),
+        # Newest application / response ids: two primary-key lookups, changes on every insert
+        "stats_token_stmt": """
+            SELECT (SELECT MAX(id) FROM applications), (SELECT MAX(id) FROM responses)
+        """,
+        "statistics_stmt": """
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE response_received = TRUE),
+                   COUNT(DISTINCT company_id),
+                   COUNT(*) FILTER (WHERE response_received = FALSE
+                                    AND next_follow_up_date <= NOW()),
+                   (SELECT COUNT(*) FROM responses WHERE sentiment = 'Positive')
+            FROM applications
+        """,
+    }
+
+    POOL_MIN_CONN = 2
+    POOL_MAX_CONN = 25
+
+    # Bump whenever create_tables' indexes change; the next startup re-applies them
+    SCHEMA_VERSION = 1
+
+    # get_statistics result is reused for this long unless the change token moves
+    STATS_CACHE_TTL = 60
+
     def __init__(self):
         # PostgreSQL connection parameters
         self.host = os.getenv("DB_HOST")
@@ -18,266 +141,390 @@ class InternshipDB:
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
 
-        self.conn = None
+        self.pool = None
+        self._finalizer = None
+        self._stats_cache = (None, 0.0, None)  # (token, expires_at, stats)
+        self._stats_lock = threading.Lock()
         self.connect()
         self.create_tables()
 
     def connect(self):
-        """Establish PostgreSQL connection"""
+        """Open the PostgreSQL connection pool"""
         try:
-            self.conn = psycopg2.connect(
+            self.pool = ThreadedConnectionPool(
+                self.POOL_MIN_CONN,
+                self.POOL_MAX_CONN,
                 host=self.host,
                 port=self.port,
                 database=self.database,
                 user=self.user,
-                password=self.password
+                password=self.password,
+                connection_factory=_PooledConnection,
+                # Commits return without waiting for the WAL flush (a crash can lose
+                # the last few hundred ms of writes, never corrupt the database)
+                options="-c synchronous_commit=off"
             )
+            # Closes the pool if the object is dropped without close(); holds no reference to self
+            self._finalizer = weakref.finalize(self, self.pool.closeall)
             print("✅ Connected to PostgreSQL")
         except psycopg2.Error as e:
             print(f"❌ Connection error: {e}")
             raise
 
+    @contextmanager
+    def _cursor(self, prepare=True, name=None):
+        """
+        Borrow a pooled connection for one unit of work
+        Commits on success, rolls back on error, always returns the connection
+        A name gives a server-side cursor that streams rows instead of loading them all
+        """
+        conn = self.pool.getconn()
+        try:
+            if prepare and not conn.prepared:
+                self._prepare_statements(conn)
+            cursor = conn.cursor(name=name)
+            try:
+                yield cursor
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            self.pool.putconn(conn)
+
     def create_tables(self):
         """Create database tables if they don't exist"""
-        cursor = self.conn.cursor()
-
         try:
-            # Companies table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS companies (
-                    id SERIAL PRIMARY KEY,
-                    company_name VARCHAR(255) NOT NULL,
-                    email VARCHAR(255) NOT NULL UNIQUE,
-                    contact_name VARCHAR(255),
-                    website VARCHAR(255),
-                    field VARCHAR(255),
-                    priority INTEGER DEFAULT 3 CHECK (priority >= 1 AND priority <= 5),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Applications table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS applications (
-                    id SERIAL PRIMARY KEY,
-                    company_id INTEGER NOT NULL,
-                    subject VARCHAR(255),
-                    email_body TEXT,
-                    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status VARCHAR(50) DEFAULT 'Sent',
-                    response_received BOOLEAN DEFAULT FALSE,
-                    response_date TIMESTAMP,
-                    follow_up_count INTEGER DEFAULT 0,
-                    next_follow_up_date TIMESTAMP,
-                    ai_reviewed BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
-                )
-            """)
+            with self._cursor(prepare=False) as cursor:
+                # Companies table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS companies (
+                        id SERIAL PRIMARY KEY,
+                        company_name VARCHAR(255) NOT NULL,
+                        email VARCHAR(255) NOT NULL UNIQUE,
+                        contact_name VARCHAR(255),
+                        website VARCHAR(255),
+                        field VARCHAR(255),
+                        priority INTEGER DEFAULT 3 CHECK (priority >= 1 AND priority <= 5),
+                        notes TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+                # Applications table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS applications (
+                        id SERIAL PRIMARY KEY,
+                        company_id INTEGER NOT NULL,
+                        subject VARCHAR(255),
+                        email_body TEXT,
+                        sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        status VARCHAR(50) DEFAULT 'Sent',
+                        response_received BOOLEAN DEFAULT FALSE,
+                        response_date TIMESTAMP,
+                        follow_up_count INTEGER DEFAULT 0,
+                        next_follow_up_date TIMESTAMP,
+                        ai_reviewed BOOLEAN DEFAULT FALSE,
+                        FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+                    )
+                """)
+
+                # Responses table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        id SERIAL PRIMARY KEY,
+                        application_id INTEGER NOT NULL,
+                        received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        subject VARCHAR(255),
+                        body TEXT,
+                        sentiment VARCHAR(50),
+                        FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE
+                    )
+                """)
+
+                # Job posts table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS job_posts (
+                        id SERIAL PRIMARY KEY,
+                        title VARCHAR(255),
+                        company_name VARCHAR(255),
+                        location VARCHAR(255),
+                        description TEXT,
+                        url VARCHAR(255) UNIQUE,
+                        posted_date DATE,
+                        source VARCHAR(100),
+                        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        applied BOOLEAN DEFAULT FALSE
+                    )
+                """)
+
+                # Indexes and planner statistics only change with SCHEMA_VERSION, so
+                # routine startups skip the DROP/CREATE and ANALYZE work
+                cursor.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+                cursor.execute("SELECT MAX(version) FROM schema_version")
+                if cursor.fetchone()[0] != self.SCHEMA_VERSION:
+                    self._create_indexes(cursor)
+                    cursor.execute("DELETE FROM schema_version")
+                    cursor.execute("INSERT INTO schema_version (version) VALUES (%s)", (self.SCHEMA_VERSION,))
 
-            # Responses table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS responses (
-                    id SERIAL PRIMARY KEY,
-                    application_id INTEGER NOT NULL,
-                    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    subject VARCHAR(255),
-                    body TEXT,
-                    sentiment VARCHAR(50),
-                    FOREIGN KEY (application_id) REFERENCES applications(id) ON DELETE CASCADE
-                )
-            """)
-
-            # Job posts table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS job_posts (
-                    id SERIAL PRIMARY KEY,
-                    title VARCHAR(255),
-                    company_name VARCHAR(255),
-                    location VARCHAR(255),
-                    description TEXT,
-                    url VARCHAR(255) UNIQUE,
-                    posted_date DATE,
-                    source VARCHAR(100),
-                    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    applied BOOLEAN DEFAULT FALSE
-                )
-            """)
-
-            # Create indexes for performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_companies_email ON companies(email)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_company_id ON applications(company_id)")
-            cursor.execute(
-                "CREATE INDEX IF NOT EXISTS idx_applications_response_received ON applications(response_received)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_posts_url ON job_posts(url)")
-
-            self.conn.commit()
             print("✅ Tables created successfully")
         except psycopg2.Error as e:
-            self.conn.rollback()
             print(f"❌ Error creating tables: {e}")
             raise
+
+    def _create_indexes(self, cursor):
+        """Bring the indexes up to SCHEMA_VERSION and refresh planner statistics"""
+        # Create indexes for performance
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_company_id ON applications(company_id)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_applications_response_received ON applications(response_received)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_sent_at ON applications(sent_at)")
+
+        # Covering index: per-application sentiment/date lookups are index-only scans
+        cursor.execute("DROP INDEX IF EXISTS idx_responses_application_id")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_responses_app_cover
+            ON responses(application_id) INCLUDE (sentiment, received_at)
+        """)
+
+        # companies.email and job_posts.url are UNIQUE, which already indexes them
+        cursor.execute("DROP INDEX IF EXISTS idx_companies_email")
+        cursor.execute("DROP INDEX IF EXISTS idx_job_posts_url")
+
+        # Partial indexes: only the rows the follow-up and report queries look at
+        cursor.execute("DROP INDEX IF EXISTS idx_apps_followup")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_apps_pending_followup
+            ON applications(next_follow_up_date, company_id)
+            WHERE response_received = FALSE AND follow_up_count < 3
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_responses_positive
+            ON responses(received_at)
+            WHERE sentiment = 'Positive'
+        """)
+
+        # Fresh planner statistics so the indexes above get picked
+        cursor.execute("ANALYZE companies, applications, responses, job_posts")
+
+    def _prepare_statements(self, conn):
+        """Prepare PREPARED_STATEMENTS on a pooled connection (once per session)"""
+        cursor = conn.cursor()
+        try:
+            for name, statement in self.PREPARED_STATEMENTS.items():
+                cursor.execute(f"PREPARE {name} AS {statement}")
+            conn.commit()
+            conn.prepared = True
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"❌ Error preparing statements: {e}")
+            raise
         finally:
             cursor.close()
 
+    def _insert_bulk(self, query, rows, batch_size, label, template=None):
+        """
+        Run an execute_values INSERT ... RETURNING id over rows, batch_size rows per statement
+        All batches share one transaction; returns the ids produced by RETURNING
+        """
+        ids = []
+        try:
+            with self._cursor() as cursor:
+                for batch in _batches(rows, batch_size):
+                    inserted = execute_values(cursor, query, batch, template=template,
+                                              page_size=batch_size, fetch=True)
+                    ids.extend(row[0] for row in inserted)
+        except psycopg2.Error as e:
+            print(f"❌ Error adding {label}: {e}")
+            return []
+        return ids
+
     # ==================== COMPANY OPERATIONS ====================
 
     def add_company(self, company_name, email, contact_name=None, website=None, field=None, priority=3):
         """Add a new company"""
-        cursor = self.conn.cursor()
         try:
-            cursor.execute("""
-                INSERT INTO companies (company_name, email, contact_name, website, field, priority)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (company_name, email, contact_name, website, field, priority))
-
-            company_id = cursor.fetchone()[0]
-            self.conn.commit()
-            print(f"✅ Company added with ID: {company_id}")
-            return company_id
-        except psycopg2.errors.UniqueViolation:
-            self.conn.rollback()
-            print(f"⚠️ Company with email {email} already exists")
-            return None
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "EXECUTE add_company_stmt(%s, %s, %s, %s, %s, %s)",
+                    (company_name, email, contact_name, website, field, priority)
+                )
+
+                result = cursor.fetchone()
         except psycopg2.Error as e:
-            self.conn.rollback()
             print(f"❌ Error adding company: {e}")
             return None
-        finally:
-            cursor.close()
+
+        if result is None:
+            print(f"⚠️ Company with email {email} already exists")
+            return None
+
+        company_id = result[0]
+        print(f"✅ Company added with ID: {company_id}")
+        return company_id
+
+    def add_companies_bulk(self, companies, batch_size=1000):
+        """
+        Add many companies in one transaction
+        companies: iterable of dicts with add_company's arguments
+        Returns the ids of the companies actually inserted (existing emails are skipped)
+        """
+        rows = (
+            (c["company_name"], c["email"], c.get("contact_name"), c.get("website"),
+             c.get("field"), c.get("priority", 3))
+            for c in companies
+        )
+        return self._insert_bulk("""
+            INSERT INTO companies (company_name, email, contact_name, website, field, priority)
+            VALUES %s
+            ON CONFLICT (email) DO NOTHING
+            RETURNING id
+        """, rows, batch_size, "companies")
 
     def get_all_companies(self):
         """Get all companies"""
-        cursor = self.conn.cursor()
-        try:
+        with self._cursor() as cursor:
             cursor.execute("SELECT * FROM companies ORDER BY priority ASC, created_at DESC")
             columns = [desc[0] for desc in cursor.description]
             companies = [dict(zip(columns, row)) for row in cursor.fetchall()]
             return companies
-        finally:
-            cursor.close()
 
     # ==================== APPLICATION OPERATIONS ====================
 
     def log_application(self, company_id, subject, email_body, ai_reviewed=False):
         """Log an application sent"""
-        cursor = self.conn.cursor()
         try:
-            next_followup = datetime.now() + timedelta(days=7)
-            cursor.execute("""
-                INSERT INTO applications (company_id, subject, email_body, next_follow_up_date, ai_reviewed)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            """, (company_id, subject, email_body, next_followup, ai_reviewed))
-
-            app_id = cursor.fetchone()[0]
-            self.conn.commit()
-            return app_id
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "EXECUTE log_application_stmt(%s, %s, %s, %s)",
+                    (company_id, subject, email_body, ai_reviewed)
+                )
+
+                app_id = cursor.fetchone()[0]
+                return app_id
         except psycopg2.Error as e:
-            self.conn.rollback()
             print(f"❌ Error logging application: {e}")
             return None
-        finally:
-            cursor.close()
+
+    def log_applications_bulk(self, applications, batch_size=1000):
+        """
+        Log many sent applications in one transaction
+        applications: iterable of dicts with log_application's arguments
+        Returns the new application ids
+        """
+        rows = (
+            (a["company_id"], a["subject"], a["email_body"], a.get("ai_reviewed", False))
+            for a in applications
+        )
+        return self._insert_bulk("""
+            INSERT INTO applications (company_id, subject, email_body, next_follow_up_date, ai_reviewed)
+            VALUES %s
+            RETURNING id
+        """, rows, batch_size, "applications",
+            template="(%s, %s, %s, CURRENT_TIMESTAMP + INTERVAL '7 days', %s)")
 
     def get_companies_needing_followup(self):
         """Get companies needing follow-up"""
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT c.id, c.company_name, c.email, c.contact_name, 
-                       a.sent_at, a.follow_up_count,
-                       EXTRACT(DAY FROM (NOW() - a.sent_at)) as days_ago
-                FROM companies c
-                JOIN applications a ON c.id = a.company_id
-                WHERE a.response_received = FALSE 
-                AND a.next_follow_up_date <= NOW()
-                AND a.follow_up_count < 3
-                ORDER BY c.priority ASC, a.sent_at ASC
-            """)
+        with self._cursor() as cursor:
+            cursor.execute("EXECUTE companies_needing_followup_stmt")
 
             columns = [desc[0] for desc in cursor.description]
             companies = [dict(zip(columns, row)) for row in cursor.fetchall()]
             return companies
-        finally:
-            cursor.close()
+
+    def iter_companies_needing_followup(self, batch_size=500):
+        """
+        Yield companies needing follow-up from a server-side cursor, batch_size rows per round-trip
+        Holds a pooled connection and its transaction until exhausted or closed, so
+        collect what you need before slow work such as sending emails
+        """
+        with self._cursor(prepare=False, name="companies_needing_followup") as cursor:
+            cursor.itersize = batch_size
+            # Named cursors cannot run EXECUTE, so this declares the same query directly
+            cursor.execute(self.PREPARED_STATEMENTS["companies_needing_followup_stmt"])
+
+            columns = None
+            for row in cursor:
+                if columns is None:
+                    columns = [desc[0] for desc in cursor.description]
+                yield dict(zip(columns, row))
 
     def mark_response_received(self, application_id, response_body, sentiment="Neutral"):
         """Mark application as responded"""
-        cursor = self.conn.cursor()
         try:
-            cursor.execute("""
-                UPDATE applications 
-                SET response_received = TRUE, response_date = NOW()
-                WHERE id = %s
-            """, (application_id,))
+            with self._cursor() as cursor:
+                cursor.execute("EXECUTE mark_responded_stmt(%s)", (application_id,))
+                cursor.execute(
+                    "EXECUTE add_response_stmt(%s, %s, %s)",
+                    (application_id, response_body, sentiment)
+                )
+        except psycopg2.Error as e:
+            print(f"❌ Error marking response: {e}")
 
-            cursor.execute("""
-                INSERT INTO responses (application_id, body, sentiment)
-                VALUES (%s, %s, %s)
-            """, (application_id, response_body, sentiment))
+    def mark_responses_bulk(self, responses, batch_size=1000):
+        """
+        Mark many applications as responded in one transaction
+        responses: iterable of dicts with mark_response_received's arguments
+        Returns the number of applications marked
+        """
+        rows = [
+            (r["application_id"], r["response_body"], r.get("sentiment", "Neutral"))
+            for r in responses
+        ]
+        if not rows:
+            return 0
 
-            self.conn.commit()
+        try:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    UPDATE applications
+                    SET response_received = TRUE, response_date = NOW()
+                    WHERE id = ANY(%s)
+                """, ([row[0] for row in rows],))
+                marked = cursor.rowcount
+
+                execute_values(cursor, """
+                    INSERT INTO responses (application_id, body, sentiment)
+                    VALUES %s
+                """, rows, page_size=batch_size)
         except psycopg2.Error as e:
-            self.conn.rollback()
-            print(f"❌ Error marking response: {e}")
-        finally:
-            cursor.close()
+            print(f"❌ Error marking responses: {e}")
+            return 0
+        return marked
 
     def update_follow_up(self, application_id):
         """Update follow-up count and date"""
-        cursor = self.conn.cursor()
         try:
-            cursor.execute("""
-                UPDATE applications 
-                SET follow_up_count = follow_up_count + 1,
-                    next_follow_up_date = NOW() + INTERVAL '7 days'
-                WHERE id = %s
-            """, (application_id,))
-
-            self.conn.commit()
+            with self._cursor() as cursor:
+                cursor.execute("EXECUTE update_follow_up_stmt(%s)", (application_id,))
         except psycopg2.Error as e:
-            self.conn.rollback()
             print(f"❌ Error updating follow-up: {e}")
-        finally:
-            cursor.close()
 
     # ==================== STATISTICS ====================
 
     def get_statistics(self):
-        """Get comprehensive statistics"""
-        cursor = self.conn.cursor()
-        try:
-            # Total sent
-            cursor.execute("SELECT COUNT(*) FROM applications")
-            total_sent = cursor.fetchone()[0]
-
-            # Responses
-            cursor.execute("SELECT COUNT(*) FROM applications WHERE response_received = TRUE")
-            responses = cursor.fetchone()[0]
-
-            # Companies contacted
-            cursor.execute("SELECT COUNT(DISTINCT company_id) FROM applications")
-            companies_contacted = cursor.fetchone()[0]
-
-            # Follow-ups needed
-            cursor.execute("""
-                SELECT COUNT(*) FROM applications 
-                WHERE response_received = FALSE AND next_follow_up_date <= NOW()
-            """)
-            followups_needed = cursor.fetchone()[0]
-
-            # Positive responses
-            cursor.execute("""
-                SELECT COUNT(*) FROM responses WHERE sentiment = 'Positive'
-            """)
-            positive = cursor.fetchone()[0]
+        """
+        Get comprehensive statistics
+        Cached until an application/response is added or STATS_CACHE_TTL expires
+        """
+        with self._cursor() as cursor:
+            cursor.execute("EXECUTE stats_token_stmt")
+            token = cursor.fetchone()
+            with self._stats_lock:
+                cached_token, expires_at, stats = self._stats_cache
+            if token == cached_token and time.monotonic() < expires_at:
+                return dict(stats)
+
+            # All counters in one pass over applications
+            cursor.execute("EXECUTE statistics_stmt")
+            total_sent, responses, companies_contacted, followups_needed, positive = cursor.fetchone()
 
             pending = total_sent - responses
             response_rate = (responses / total_sent * 100) if total_sent > 0 else 0
 
-            return {
+            stats = {
                 "total_sent": total_sent,
                 "responses": responses,
                 "positive": positive,
@@ -286,36 +533,44 @@ class InternshipDB:
                 "followups_needed": followups_needed,
                 "response_rate": round(response_rate, 2)
             }
-        finally:
-            cursor.close()
+
+        with self._stats_lock:
+            self._stats_cache = (token, time.monotonic() + self.STATS_CACHE_TTL, stats)
+        return dict(stats)
 
     # ==================== JOB POSTS ====================
 
     def add_job_post(self, title, company, location, description, url, source):
         """Add a job posting"""
-        cursor = self.conn.cursor()
         try:
-            cursor.execute("""
-                INSERT INTO job_posts (title, company_name, location, description, url, source)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (url) DO NOTHING
-                RETURNING id
-            """, (title, company, location, description, url, source))
+            with self._cursor() as cursor:
+                cursor.execute(
+                    "EXECUTE add_job_post_stmt(%s, %s, %s, %s, %s, %s)",
+                    (title, company, location, description, url, source)
+                )
 
-            result = cursor.fetchone()
-            self.conn.commit()
-            return result[0] if result else None
+                result = cursor.fetchone()
+                return result[0] if result else None
         except psycopg2.Error as e:
-            self.conn.rollback()
             print(f"❌ Error adding job post: {e}")
             return None
-        finally:
-            cursor.close()
+
+    def add_job_posts_bulk(self, jobs, batch_size=1000):
+        """
+        Add many job postings in one transaction
+        jobs: iterable of dicts with add_job_post's keys
+        Returns the URLs of the posts actually inserted (known URLs are skipped)
+        """
+        try:
+            with self._cursor() as cursor:
+                return insert_job_posts(cursor, jobs, batch_size, prepared=True)
+        except psycopg2.Error as e:
+            print(f"❌ Error adding job posts: {e}")
+            return []
 
     def get_unapplied_jobs(self, limit=10):
         """Get unapplied job posts"""
-        cursor = self.conn.cursor()
-        try:
+        with self._cursor() as cursor:
             cursor.execute("""
                 SELECT * FROM job_posts 
                 WHERE applied = FALSE
@@ -326,15 +581,12 @@ class InternshipDB:
             columns = [desc[0] for desc in cursor.description]
             jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
             return jobs
-        finally:
-            cursor.close()
 
     # ==================== TIMELINE ANALYTICS ====================
 
     def get_application_timeline(self, days=30):
         """Get applications sent in last N days"""
-        cursor = self.conn.cursor()
-        try:
+        with self._cursor() as cursor:
             cursor.execute("""
                 SELECT DATE(sent_at) as date, COUNT(*) as count
                 FROM applications
@@ -345,13 +597,10 @@ class InternshipDB:
 
             timeline = cursor.fetchall()
             return timeline
-        finally:
-            cursor.close()
 
     def get_response_time_stats(self):
         """Get average response time"""
-        cursor = self.conn.cursor()
-        try:
+        with self._cursor() as cursor:
             cursor.execute("""
                 SELECT 
                     ROUND(AVG(EXTRACT(DAY FROM (response_date - sent_at)))) as avg_days,
@@ -367,54 +616,189 @@ class InternshipDB:
                 "min_response_days": result[1] or 0,
                 "max_response_days": result[2] or 0
             }
-        finally:
-            cursor.close()
 
     # ==================== CLEANUP ====================
 
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        """Close every pooled connection"""
+        if self.pool and not self.pool.closed:
+            self._finalizer()
             print("✅ Database connection closed")
 
-    def __del__(self):
-        """Destructor to ensure connection is closed"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
         self.close()
 
 
+# ==================== EMAIL SENDING ====================
+class EmailManager:
+    SMTP_HOST = "smtp.gmail.com"
+    SMTP_PORT = 465
+
+    # Concurrent SMTP sessions in send_applications_bulk (Gmail throttles far beyond this)
+    MAX_WORKERS = 8
+
+    # Sends finishing within this many seconds of each other are logged in one transaction
+    LOG_GROUP_WINDOW = 0.01
+
+    def __init__(self, email=None, password=None):
+        self.email = email or os.getenv("EMAIL_ADDRESS") or os.getenv("EMAIL")
+        self.password = password or os.getenv("EMAIL_PASSWORD")
+        self.smtp = None
+
+    def _connect(self):
+        """Open and log in a Gmail SMTP session (TLS handshake + AUTH happen here only)"""
+        smtp = smtplib.SMTP_SSL(self.SMTP_HOST, self.SMTP_PORT)
+        smtp.login(self.email, self.password)
+        return smtp
+
+    def _build_message(self, to_email, subject, body, attachments=None):
+        """Build the EmailMessage for one application; attachments are file paths"""
+        msg = EmailMessage()
+        msg["From"] = self.email
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.set_content(body)
+
+        for path in attachments or []:
+            content_type, _ = mimetypes.guess_type(path)
+            maintype, subtype = (content_type or "application/octet-stream").split("/", 1)
+            with open(path, "rb") as f:
+                msg.add_attachment(f.read(), maintype=maintype, subtype=subtype,
+                                   filename=os.path.basename(path))
+        return msg
+
+    def _send(self, session, to_email, contact_name, subject, body, attachments=None):
+        """
+        Send one application on session.smtp, logging in on first use; True on success
+        A session the server dropped is reopened once and the send retried
+        """
+        try:
+            msg = self._build_message(to_email, subject, body, attachments)
+            if session.smtp is None:
+                session.smtp = self._connect()
+            try:
+                session.smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                session.smtp = self._connect()
+                session.smtp.send_message(msg)
+            print(f"📧 Application sent to {contact_name or to_email}")
+            return True
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"❌ Error sending to {to_email}: {e}")
+            return False
+
+    @staticmethod
+    def _quit(smtp):
+        """Close an SMTP session, ignoring one the server already dropped"""
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def send_application(self, to_email, contact_name, subject, body, attachments=None):
+        """Send one application email (the SMTP session is kept open for the next one)"""
+        return self._send(self, to_email, contact_name, subject, body, attachments)
+
+    def send_applications_bulk(self, applications, db=None, max_workers=MAX_WORKERS):
+        """
+        Send many applications concurrently, one SMTP session per worker thread
+        applications: list of dicts with send_application's arguments (+ company_id for logging)
+        If db is given, sent ones are logged as they go by a single writer thread
+        Returns the applications that were sent
+        """
+        local = threading.local()
+        sessions = []
+        sessions_lock = threading.Lock()
+
+        log_queue = Queue()
+        writer = None
+        if db is not None:
+            writer = threading.Thread(target=self._log_writer, args=(db, log_queue), daemon=True)
+            writer.start()
+
+        def send(app):
+            # smtplib.SMTP_SSL is not thread-safe: each worker keeps its own session
+            if not hasattr(local, "session"):
+                local.session = SimpleNamespace(smtp=None)
+                with sessions_lock:
+                    sessions.append(local.session)
+            ok = self._send(local.session, app["to_email"], app.get("contact_name"),
+                            app["subject"], app["body"], app.get("attachments"))
+            if ok and writer is not None and "company_id" in app:
+                log_queue.put({"company_id": app["company_id"], "subject": app["subject"],
+                               "email_body": app["body"], "ai_reviewed": app.get("ai_reviewed", False)})
+            return ok
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(send, applications))
+        finally:
+            for session in sessions:
+                if session.smtp is not None:
+                    self._quit(session.smtp)
+            if writer is not None:
+                log_queue.put(None)
+                writer.join()
+
+        return [app for app, ok in zip(applications, results) if ok]
+
+    def _log_writer(self, db, log_queue):
+        """
+        Log sent applications from log_queue until a None sentinel arrives
+        Everything queued within LOG_GROUP_WINDOW of the first item shares one log_applications_bulk call
+        """
+        while (item := log_queue.get()) is not None:
+            group = [item]
+            deadline = time.monotonic() + self.LOG_GROUP_WINDOW
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    item = log_queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if item is None:
+                    db.log_applications_bulk(group)
+                    return
+                group.append(item)
+            db.log_applications_bulk(group)
+
+    def close(self):
+        """Close the SMTP session used by send_application"""
+        if self.smtp is not None:
+            self._quit(self.smtp)
+            self.smtp = None
+
+
 # ==================== USAGE EXAMPLE ====================
 if __name__ == "__main__":
-    # Initialize database
-    db = InternshipDB()
-
-    # Add a company
-    company_id = db.add_company(
-        company_name="TechCorp",
-        email="hr@techcorp.com",
-        contact_name="Sarah Johnson",
-        field="Software Engineering",
-        priority=1
-    )
-
-    # Log an application
-    if company_id:
-        app_id = db.log_application(
-            company_id=company_id,
-            subject="PFE Internship Application",
-            email_body="Your email here...",
-            ai_reviewed=True
+    # Initialize database (closed automatically at the end of the block)
+    with InternshipDB() as db:
+        # Add a company
+        company_id = db.add_company(
+            company_name="TechCorp",
+            email="hr@techcorp.com",
+            contact_name="Sarah Johnson",
+            field="Software Engineering",
+            priority=1
         )
-        print(f"✅ Application logged with ID: {app_id}")
 
-    # Get statistics
-    stats = db.get_statistics()
-    print("\n📊 Statistics:")
-    print(json.dumps(stats, indent=2))
+        # Log an application
+        if company_id:
+            app_id = db.log_application(
+                company_id=company_id,
+                subject="PFE Internship Application",
+                email_body="Your email here...",
+                ai_reviewed=True
+            )
+            print(f"✅ Application logged with ID: {app_id}")
 
-    # Get companies needing follow-up
-    followups = db.get_companies_needing_followup()
-    print(f"\n🔔 Companies needing follow-up: {len(followups)}")
+        # Get statistics
+        stats = db.get_statistics()
+        print("\n📊 Statistics:")
+        print(json.dumps(stats, indent=2))
 
-    # Close connection
-    db.close()
+        # Get companies needing follow-up
+        followups = db.get_companies_needing_followup()
+        print(f"\n🔔 Companies needing follow-up: {len(followups)}")